@@ -0,0 +1,239 @@
+import time
+import asyncio
+import weakref
+import threading
+import contextvars
+from contextlib import contextmanager, asynccontextmanager
+
+from backend import telemetry
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request could not be admitted within the queue timeout.
+    """
+
+
+class AdmissionController:
+    """
+    Admission for upstream LLM calls: a token bucket (rate_per_second, burst)
+    plus a cap on concurrent calls. Requests that cannot start immediately
+    wait in line for up to queue_timeout seconds and are then shed.
+    A rate or cap of 0 disables that limit.
+    """
+
+    def __init__(self, rate_per_second, burst, max_concurrent, queue_timeout):
+        self.rate = rate_per_second
+        self.burst = max(1.0, burst)
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+
+    def _try_take(self):
+        """
+        Takes a slot and a token if both are available and returns 0;
+        otherwise returns how long to wait before trying again.
+        """
+        now = time.monotonic()
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.max_concurrent and self._active >= self.max_concurrent:
+            return 0.05  # Woken early by release()
+        if self.rate and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        if self.rate:
+            self._tokens -= 1
+        self._active += 1
+        self.admitted += 1
+        return 0
+
+    def _shed(self):
+        self.shed += 1
+        telemetry.metrics.inc("saarthi_admission_shed_total")
+        raise Overloaded(f"LLM capacity exhausted, waited {self.queue_timeout:g}s")
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.perf_counter()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    wait = self._try_take()
+                    if not wait:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._shed()
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self.waiting -= 1
+        telemetry.record_stage("admission_wait", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aadmit(self, timeout=None):
+        timeout = self.queue_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.perf_counter()
+        while True:
+            with self._cond:
+                wait = self._try_take()
+                if not wait:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._shed()
+            await asyncio.sleep(min(wait, remaining))
+        telemetry.record_stage("admission_wait", time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._cond:
+            return {"name": "llm_admission", "active": self._active, "waiting": self.waiting,
+                    "admitted": self.admitted, "shed": self.shed}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Broadcast:
+    """
+    Items of one producer, replayable by any number of consumers.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.error = None
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def produce(self, iterator):
+        try:
+            for item in iterator:
+                with self.cond:
+                    self.items.append(item)
+                    self.cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+
+    def consume(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.items) and not self.closed:
+                    self.cond.wait()
+                if i >= len(self.items):
+                    if self.error is not None:
+                        raise self.error
+                    return
+                item = self.items[i]
+            i += 1
+            yield item
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests: the first caller for a key does
+    the work, callers arriving while it runs wait for and share its result.
+    Nothing is kept once the call completes (caching is a separate layer).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self._async_calls = weakref.WeakKeyDictionary()  # Event loop -> key -> task
+
+    def do(self, key, fn):
+        """
+        Returns (result, shared); shared is True for callers that joined an
+        in-flight call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def stream(self, key, factory):
+        """
+        Returns (iterator, shared). The first caller's factory() generator is
+        drained on a background thread, so followers (who replay from the
+        first item) are not tied to the leader's consumer going away.
+        """
+        with self._lock:
+            flight = self._streams.get(key)
+            shared = flight is not None
+            if not shared:
+                flight = self._streams[key] = _Broadcast()
+
+                def run():
+                    try:
+                        flight.produce(factory())
+                    finally:
+                        with self._lock:
+                            self._streams.pop(key, None)
+
+                context = contextvars.copy_context()
+                threading.Thread(target=context.run, args=(run,), daemon=True, name="saarthi-flight").start()
+        return flight.consume(), shared
+
+    async def ado(self, key, coroutine_fn):
+        """
+        Async do(); the shared task is shielded, so a cancelled caller does not
+        cancel the work for everyone else.
+        """
+        loop = asyncio.get_running_loop()
+        calls = self._async_calls.setdefault(loop, {})
+        task = calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = calls[key] = asyncio.ensure_future(coroutine_fn())
+            task.add_done_callback(lambda _: calls.pop(key, None))
+        return await asyncio.shield(task), shared
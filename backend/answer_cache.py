@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    query TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    sources TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS answers_scope ON answers(scope);
+CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used);
+"""
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class AnswerCache:
+    """
+    Persistent semantic cache of generated answers, stored in SQLite.
+
+    Entries are scoped by (mode, language, focus, models). A lookup serves a
+    stored answer when the query embedding is within `threshold` cosine
+    similarity of a stored one. Embeddings are mirrored in memory as a
+    normalized matrix per scope, so a lookup is one matrix-vector product;
+    the mirror reloads when another process writes to the database.
+    """
+
+    def __init__(self, path, threshold=0.95, max_entries=5000, ttl=None):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._mirror = {}  # scope -> (ids ndarray, unit embedding matrix)
+        self._data_version = None
+
+    @staticmethod
+    def scope(*parts):
+        return json.dumps(list(parts))
+
+    def _refresh_mirror(self):
+        # data_version only changes when *another* connection commits, which
+        # is exactly when the in-memory mirror may be stale.
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        self._data_version = version
+
+        grouped = {}
+        for row_id, scope, blob in self._conn.execute("SELECT id, scope, embedding FROM answers"):
+            grouped.setdefault(scope, ([], []))
+            grouped[scope][0].append(row_id)
+            grouped[scope][1].append(np.frombuffer(blob, dtype=np.float32))
+        self._mirror = {
+            scope: (np.array(ids, dtype=np.int64), np.vstack(vectors))
+            for scope, (ids, vectors) in grouped.items()
+        }
+
+    def _mirror_add(self, scope, row_id, unit_vector):
+        ids, matrix = self._mirror.get(scope, (np.empty(0, dtype=np.int64), np.empty((0, unit_vector.shape[0]), dtype=np.float32)))
+        self._mirror[scope] = (np.append(ids, row_id), np.vstack([matrix, unit_vector]))
+
+    def _mirror_remove(self, removed_ids):
+        if not removed_ids:
+            return
+        removed = np.array(list(removed_ids), dtype=np.int64)
+        for scope, (ids, matrix) in list(self._mirror.items()):
+            keep = ~np.isin(ids, removed)
+            if not keep.all():
+                self._mirror[scope] = (ids[keep], matrix[keep])
+
+    def lookup(self, embedding, scope):
+        """
+        Returns (answer, sources, similarity) for the closest cached answer
+        above the threshold, or None.
+        """
+        query = _unit(embedding)
+        now = time.time()
+        with self._lock:
+            self._refresh_mirror()
+            ids, matrix = self._mirror.get(scope, (None, None))
+            if ids is None or not len(ids):
+                self.misses += 1
+                return None
+
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            row = self._conn.execute(
+                "SELECT answer, sources, created_at FROM answers WHERE id = ?", (int(ids[best]),)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[2] > self.ttl):
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE answers SET last_used = ?, hits = hits + 1 WHERE id = ?", (now, int(ids[best]))
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0], json.loads(row[1]), similarity
+
+    def store(self, query, embedding, scope, answer, sources):
+        unit_vector = _unit(embedding)
+        now = time.time()
+        with self._lock:
+            self._refresh_mirror()
+            cursor = self._conn.execute(
+                "INSERT INTO answers (scope, query, embedding, answer, sources, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, query, unit_vector.tobytes(), answer, json.dumps(sources), now, now),
+            )
+            self._mirror_add(scope, cursor.lastrowid, unit_vector)
+            self.stores += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        removed = set()
+        if self.ttl:
+            removed.update(
+                r[0] for r in self._conn.execute("SELECT id FROM answers WHERE created_at < ?", (now - self.ttl,))
+            )
+        count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - len(removed)
+        if count > self.max_entries:
+            # Least recently used first, skipping rows already expired
+            overflow = count - self.max_entries
+            for (row_id,) in self._conn.execute("SELECT id FROM answers ORDER BY last_used"):
+                if overflow <= 0:
+                    break
+                if row_id not in removed:
+                    removed.add(row_id)
+                    overflow -= 1
+        if removed:
+            self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in removed])
+            self._mirror_remove(removed)
+            self.evictions += len(removed)
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "name": "answers",
+                "size": size,
+                "max_size": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,134 @@
+import json
+import asyncio
+import contextvars
+from typing import List, Optional
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from backend.config import settings
+from backend import telemetry
+from backend.rag_engine import aretrieve_verses, agenerate_answer, stream_answer, cache_stats, warm_up
+from backend.resources import active_snapshot, get_embedder, get_verse_store
+
+# Headless HTTP service over the RAG engine. Each worker process loads the
+# models and index once at startup and serves every UI replica from them:
+#
+#   uvicorn backend.api:app --workers 4 --host 0.0.0.0 --port 8000
+#
+# (or `python -m backend.api`, which uses the API_* settings).
+
+_ready = asyncio.Event()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    # Off the event loop, so /health answers while the models load
+    warm = loop.run_in_executor(None, warm_up)
+    warm.add_done_callback(lambda _: _ready.set())
+    yield
+
+
+app = FastAPI(title="Saarthi API", lifespan=lifespan)
+
+
+class RetrieveRequest(BaseModel):
+    query: str
+    n_results: Optional[int] = None
+    source_filter: Optional[List[str]] = None
+    focus: Optional[str] = None
+
+
+class AnswerRequest(BaseModel):
+    query: str
+    history: List[dict] = []
+    mode: str = "Beginner"
+    language: str = "English"
+    focus: str = "General"
+    source_filter: Optional[List[str]] = None
+
+
+@app.get("/health")
+async def health():
+    """
+    Liveness: the process is up and serving HTTP.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness: models are loaded and an index snapshot is being served.
+    """
+    snapshot = active_snapshot()
+    if not _ready.is_set() or snapshot is None or get_embedder() is None:
+        raise HTTPException(status_code=503, detail="warming up" if not _ready.is_set() else "no index")
+    return {"status": "ready", "snapshot": snapshot.id}
+
+
+@app.post("/retrieve")
+async def retrieve(request: RetrieveRequest):
+    context, sources = await aretrieve_verses(request.query, request.n_results, request.source_filter, request.focus)
+    return {"context": context, "sources": sources}
+
+
+@app.post("/answer")
+async def answer(request: AnswerRequest):
+    answer, sources = await agenerate_answer(request.query, request.history, mode=request.mode,
+                                             language=request.language, focus=request.focus,
+                                             source_filter=request.source_filter)
+    return {"answer": answer, "sources": sources, "trace": telemetry.last_trace()}
+
+
+def _ndjson_events(request):
+    """
+    stream_answer() as newline-delimited JSON events: {"token": ...} per
+    chunk, then {"sources": [...]} and finally {"trace": {...}}.
+
+    Starlette pulls each chunk on a worker thread; every step runs in one
+    copied context so the request's trace survives across threads.
+    """
+    context = contextvars.copy_context()
+    tokens = context.run(stream_answer, request.query, request.history, mode=request.mode,
+                         language=request.language, focus=request.focus, source_filter=request.source_filter)
+    while True:
+        try:
+            item = context.run(next, tokens)
+        except StopIteration:
+            break
+        event = {"sources": item} if isinstance(item, list) else {"token": item}
+        yield json.dumps(event, ensure_ascii=False) + "\n"
+    yield json.dumps({"trace": context.run(telemetry.last_trace)}, ensure_ascii=False) + "\n"
+
+
+@app.post("/answer/stream")
+def answer_stream(request: AnswerRequest):
+    return StreamingResponse(_ndjson_events(request), media_type="application/x-ndjson")
+
+
+@app.get("/verse-of-the-day")
+async def verse_of_the_day(source: Optional[str] = None):
+    store = get_verse_store()
+    verse = store.verse_of_the_day(source=source) if store else None
+    if verse is None:
+        raise HTTPException(status_code=404, detail="no verse store")
+    return verse
+
+
+@app.get("/stats")
+async def stats():
+    return cache_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return telemetry.render_prometheus()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("backend.api:app", host=settings.API_HOST, port=settings.API_PORT, workers=settings.API_WORKERS)
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import asyncio
+
+from backend.config import settings
+from backend.admission import AdmissionController
+from backend.llm import LLMUnavailable
+from backend.resources import get_llm
+from backend.rag_engine import agenerate_answer, retrieve_batch, warm_up
+from backend.taxonomy import SCRIPTURE_SOURCES
+
+# Offline question answering for digests, FAQ pages and regression checks.
+# Questions are read from JSONL, one object per line:
+#
+#   {"id": "q1", "question": "...", "mode": "Scholar", "language": "Hindi", "focus": "Work/Career"}
+#
+# Only "question" is required; items without an id are keyed by line number.
+# Each window of questions is embedded in one encoder call and vector-searched
+# together (one search per distinct filter), then answered concurrently under
+# a request rate, and every result is appended to the
+# output JSONL as soon as it is ready. Rerunning with the same output resumes:
+# items already answered without error are skipped.
+
+
+def read_questions(path):
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            question = item.get("question") or item.get("query")
+            if not question:
+                raise ValueError(f"{path}:{line_number}: missing 'question'")
+            source_filter = item.get("source_filter")
+            if source_filter is not None and (
+                not isinstance(source_filter, list) or any(source not in SCRIPTURE_SOURCES for source in source_filter)
+            ):
+                raise ValueError(f"{path}:{line_number}: 'source_filter' must be a list of {SCRIPTURE_SOURCES}")
+            items.append({
+                "id": item.get("id", line_number),
+                "question": question,
+                "mode": item.get("mode", "Beginner"),
+                "language": item.get("language", "English"),
+                "focus": item.get("focus", "General"),
+                "source_filter": source_filter,
+                "history": item.get("history", []),
+            })
+    return items
+
+
+def completed_ids(output_path):
+    """
+    Ids whose latest record in the output has no error.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A line cut short by a crash
+            if record.get("error"):
+                done.discard(record.get("id"))
+            else:
+                done.add(record.get("id"))
+    return done
+
+
+async def _answer(item, pacer):
+    """
+    Result record for one item. Calls that fell back to a retrieval-only
+    answer (LLM unavailable, shed, timed out) are recorded as errors so a
+    resumed run retries them.
+    """
+    started = time.perf_counter()
+    record = {key: item[key] for key in ("id", "question", "mode", "language", "focus")}
+    try:
+        async with pacer.aadmit():
+            answer, sources, error = await agenerate_answer(item["question"], item["history"], mode=item["mode"],
+                                                            language=item["language"], focus=item["focus"],
+                                                            source_filter=item["source_filter"], return_error=True)
+        record.update(answer=answer, sources=sources)
+        if error:
+            record["error"] = error
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return record
+
+
+async def answer_batch(items, output_path, concurrency=None, rate_per_second=None, window=None, resume=True):
+    """
+    Answers items (as returned by read_questions) into output_path and
+    returns a summary. At most `concurrency` questions are in flight, and
+    new ones start at no more than rate_per_second (0 = unlimited).
+    Raises LLMUnavailable up front when no LLM client is configured, rather
+    than writing placeholder answers that a resumed run would skip.
+    """
+    concurrency = concurrency or settings.BATCH_CONCURRENCY
+    rate_per_second = settings.LLM_RATE_PER_SECOND if rate_per_second is None else rate_per_second
+    window = window or settings.BATCH_WINDOW
+
+    done = completed_ids(output_path) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "answered": 0, "failed": 0}
+    if not pending:
+        return summary
+    if get_llm() is None:
+        raise LLMUnavailable("No LLM client (is GROQ_API_KEY set?); nothing was answered")
+
+    # Paces this batch only; queued items wait as long as it takes instead of being shed
+    pacer = AdmissionController(rate_per_second, burst=1, max_concurrent=concurrency, queue_timeout=float("inf"))
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+        for offset in range(0, len(pending), window):
+            chunk = pending[offset:offset + window]
+            try:
+                # Fills the retrieval cache the answers below read from
+                await loop.run_in_executor(None, retrieve_batch,
+                                           [(item["question"], item["source_filter"], item["focus"]) for item in chunk])
+            except Exception as e:
+                # Not fatal: each answer retrieves its own verses
+                print(f"⚠️  Batch retrieval failed ({e}), retrieving questions one by one.")
+
+            for task in asyncio.as_completed([_answer(item, pacer) for item in chunk]):
+                record = await task
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                summary["failed" if record.get("error") else "answered"] += 1
+            print(f"   --> {summary['answered'] + summary['failed']}/{len(pending)} questions done...")
+
+    elapsed = time.perf_counter() - started
+    summary["seconds"] = round(elapsed, 2)
+    summary["questions_per_second"] = round((summary["answered"] + summary["failed"]) / elapsed, 2) if elapsed else None
+    return summary
+
+
+def run_batch(input_path, output_path, concurrency=None, rate_per_second=None, window=None, resume=True):
+    """
+    Synchronous entry point: loads the models, then answers every question
+    in input_path into output_path.
+    """
+    warm_up()
+    items = read_questions(input_path)
+    return asyncio.run(answer_batch(items, output_path, concurrency=concurrency, rate_per_second=rate_per_second,
+                                    window=window, resume=resume))
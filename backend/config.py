@@ -3,18 +3,121 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # API Keys
-    GROQ_API_KEY: str
+    GROQ_API_KEY: str = ""
     
     # Paths (Dynamically calculated based on file location)
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DATA_DIR: str = os.path.join(BASE_DIR, "data")
+    INDEX_ROOT: str = os.path.join(DATA_DIR, "index")      # Versioned snapshots + CURRENT pointer
+    SNAPSHOT_KEEP: int = 3                                  # Published snapshots kept on disk
+    SNAPSHOT_GRACE_SECONDS: float = 600.0                   # Kept at least this long after being superseded
+
+    # Legacy flat index layout, still served until the first snapshot is published
     CHROMA_PATH: str = os.path.join(DATA_DIR, "chroma_db")
+    INDEX_MANIFEST_PATH: str = os.path.join(CHROMA_PATH, "index_manifest.json")
+    LEXICAL_INDEX_PATH: str = os.path.join(DATA_DIR, "lexical_index.json")
+    NUMPY_INDEX_DIR: str = os.path.join(DATA_DIR, "numpy_index")
+    VERSE_STORE_PATH: str = os.path.join(DATA_DIR, "verse_store.parquet")
+
+    # Vector Store
+    COLLECTION_NAME: str = "vedic_wisdom"
+    RETRIEVAL_BACKEND: str = "chroma"       # "chroma" or "numpy" (in-process exact search)
+    NUMPY_INDEX_MMAP: bool = True           # Memory-map the numpy embedding matrix
+
+    # Field-separated Indexing
+    INDEX_MODE: str = "single"              # "single" (one vector per verse) or "fields" (one per translation/Sanskrit/commentary)
+    FIELD_WEIGHT_TRANSLATION: float = 1.0   # Per-field weights of the combined verse score (0 = field not indexed)
+    FIELD_WEIGHT_SANSKRIT: float = 0.3
+    FIELD_WEIGHT_COMMENTARY: float = 0.5
+    FIELD_CANDIDATE_MULTIPLIER: int = 4     # Field vectors fetched per wanted verse before combining
+
+    # Ingestion
+    INGEST_BATCH_SIZE: int = 64     # Sentences per encoder forward pass
+    INGEST_WRITE_BATCH: int = 512   # Verses embedded and written to Chroma per chunk
+    INGEST_WORKERS: int = 0         # Encoder processes (0 = one per CPU core)
     
     # Model Configs
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     RERANKING_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
     LLM_MODEL: str = "llama-3.3-70b-versatile"
 
+    # Query Embedding
+    EMBEDDING_BACKEND: str = "torch"        # "torch" (FP32) or "onnx" (int8-quantized ONNX Runtime, CPU)
+    EMBEDDING_ONNX_DIR: str = os.path.join(DATA_DIR, "onnx_models")   # Exported models, one dir per model
+    EMBEDDING_ONNX_QCONFIG: str = "avx2"    # Quantization target: "arm64", "avx2", "avx512" or "avx512_vnni"
+    EMBEDDING_THREADS: int = 0              # CPU threads per forward pass (0 = runtime default)
+    EMBEDDING_MIN_OVERLAP: float = 0.9      # Required top-k overlap with FP32 (benchmarks/embedding_backends.py)
+
+    # LLM Client
+    LLM_TEMPERATURE: float = 0.6
+    LLM_TIMEOUT_SECONDS: float = 30.0       # Per attempt
+    LLM_DEADLINE_SECONDS: float = 60.0      # Per call, across retries, backoff and hedging (0 = no limit)
+    LLM_MAX_RETRIES: int = 3                # Retries on rate limits, timeouts and 5xx
+    LLM_RETRY_BASE_SECONDS: float = 0.5     # Jittered exponential backoff: base * 2^attempt
+    LLM_RETRY_MAX_SECONDS: float = 8.0
+    LLM_HEDGE_MODEL: str = ""               # e.g. "llama-3.1-8b-instant"; empty disables hedging
+    LLM_HEDGE_AFTER_SECONDS: float = 2.0    # Primary latency after which the hedge model is also asked
+    LLM_FALLBACK_ENABLED: bool = True       # Quote the retrieved verses when the LLM is unavailable
+
+    # LLM Admission Control
+    SINGLE_FLIGHT_ENABLED: bool = True      # Identical in-flight standalone questions share one LLM call
+    LLM_MAX_CONCURRENT: int = 16            # Concurrent LLM calls per process (0 = unlimited)
+    LLM_RATE_PER_SECOND: float = 0.0        # Token-bucket refill, e.g. 0.5 for a 30 RPM quota (0 = unlimited)
+    LLM_RATE_BURST: float = 10.0
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 10.0 # Wait for a slot before the request is shed
+
+    # Retrieval
+    RETRIEVAL_MODE: str = "hybrid"          # "dense" (vectors only) or "hybrid" (vectors + BM25 + references)
+    HYBRID_RRF_K: int = 60                  # Reciprocal-rank-fusion damping constant
+    RETRIEVAL_TOP_N: int = 3                # Verses handed to the prompt
+    FOCUS_BOOST_WEIGHT: float = 0.15        # Added similarity (and reranker probability) per unit of focus-topic affinity
+    FOCUS_TAG_THRESHOLD: float = 0.3        # Index-time affinity at which a verse is tagged with a focus
+    FOCUS_PREFILTER: bool = False           # Search only verses tagged with the active focus
+    RERANK_ENABLED: bool = True
+    RERANK_CANDIDATES: int = 30             # Vector-search over-fetch (K) for the cross-encoder
+    RERANK_LATENCY_BUDGET_MS: float = 300.0 # Retrieval + rerank budget; rerank shrinks or skips to fit
+    RERANK_REPROBE_EVERY: int = 20          # Over-budget reranks between re-measurements of the cost (0 = never)
+
+    # Query Caching
+    QUERY_CACHE_SIZE: int = 1024            # Entries per cache (0 disables)
+    QUERY_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Semantic Answer Cache (opt-in)
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_PATH: str = os.path.join(DATA_DIR, "answer_cache.sqlite3")
+    ANSWER_CACHE_SIMILARITY: float = 0.95   # Minimum cosine similarity to reuse an answer
+    ANSWER_CACHE_MAX_ENTRIES: int = 5000
+    ANSWER_CACHE_TTL_SECONDS: float = 7 * 24 * 3600.0
+
+    # Async Pipeline
+    ASYNC_MAX_CONCURRENCY: int = 32         # In-flight requests per event loop (also the HTTP pool size)
+    ASYNC_CPU_WORKERS: int = 4              # Threads for embedding, vector search and reranking
+    ASYNC_RETRIEVAL_TIMEOUT_SECONDS: float = 10.0
+    ASYNC_LLM_TIMEOUT_SECONDS: float = 60.0
+
+    # Batch Answering (backend/batch.py)
+    BATCH_CONCURRENCY: int = 8              # Questions in flight at once
+    BATCH_WINDOW: int = 256                 # Questions embedded per encoder call (keep <= QUERY_CACHE_SIZE)
+
+    # Chat History
+    HISTORY_TOKEN_BUDGET: int = 1500        # Recent turns kept verbatim
+    HISTORY_SUMMARY_TOKENS: int = 300       # Rolling summary of everything older
+
+    # Prompt
+    PROMPT_CONTEXT_TOKENS: int = 900        # Retrieved verse text per prompt, shared across verses (0 = no limit)
+
+    # HTTP API (backend/api.py)
+    API_HOST: str = "127.0.0.1"
+    API_PORT: int = 8000
+    API_WORKERS: int = 2                    # Processes; each loads the models and index once
+    API_URL: str = ""                       # e.g. "http://127.0.0.1:8000"; the UI then calls the API (empty = in-process)
+    API_TIMEOUT_SECONDS: float = 90.0       # UI -> API request timeout
+
+    # Telemetry
+    TELEMETRY_LOG_TRACES: bool = True       # One JSON log line per request with per-stage timings
+    METRICS_FILE: str = ""                  # Prometheus text file to refresh (empty disables)
+    METRICS_FILE_INTERVAL_SECONDS: float = 15.0
+
     class Config:
         env_file = ".env"
 
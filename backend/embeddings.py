@@ -0,0 +1,111 @@
+import os
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows: exports are not serialized across processes
+    fcntl = None
+
+from backend.config import settings
+
+# Query encoders. "torch" is the FP32 sentence-transformers model; "onnx" is
+# the same model exported to ONNX with dynamic int8 quantization and run by
+# ONNX Runtime on CPU. The index is always built with the FP32 model, so the
+# backend can be switched without re-indexing (see
+# benchmarks/embedding_backends.py for the top-k overlap check).
+
+BACKENDS = ("torch", "onnx")
+
+
+def onnx_model_dir(model_name=None):
+    model_name = model_name or settings.EMBEDDING_MODEL
+    return os.path.join(settings.EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+
+
+def quantized_file_name(qconfig=None):
+    return f"onnx/model_qint8_{qconfig or settings.EMBEDDING_ONNX_QCONFIG}.onnx"
+
+
+def export_quantized_model(model_name=None, qconfig=None, force=False):
+    """
+    Exports the model to ONNX and writes its dynamically int8-quantized
+    variant next to it. The export happens in a private directory that is
+    renamed into place, so a crash never leaves a half-written model behind,
+    and under a lock file, so API workers starting together export it once
+    instead of replacing the model under each other. Returns the model
+    directory.
+
+    scripts/vector_engine.py runs this when EMBEDDING_BACKEND="onnx", so
+    serving processes normally find the model already in place.
+    """
+    qconfig = qconfig or settings.EMBEDDING_ONNX_QCONFIG
+    directory = onnx_model_dir(model_name)
+    target = os.path.join(directory, quantized_file_name(qconfig))
+    if not force and os.path.exists(target):
+        return directory
+
+    os.makedirs(os.path.dirname(directory), exist_ok=True)
+    with open(f"{directory}.lock", "w") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file is closed
+        if not force and os.path.exists(target):
+            return directory  # Exported by another process while this one waited
+        _export(model_name, qconfig, directory)
+    return directory
+
+
+def _export(model_name, qconfig, directory):
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    print(f"🧊 Exporting {model_name or settings.EMBEDDING_MODEL} to ONNX (int8, {qconfig})...")
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        model = SentenceTransformer(model_name or settings.EMBEDDING_MODEL, backend="onnx", device="cpu")
+        model.save(tmp_dir)
+        export_dynamic_quantized_onnx_model(model, qconfig, tmp_dir)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.rename(tmp_dir, directory)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _session_options(threads):
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+def load_embedder(backend=None, model_name=None, threads=None):
+    """
+    Loads the query encoder for `backend` (default EMBEDDING_BACKEND). threads
+    caps the CPU threads used per forward pass (0 = runtime default).
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or settings.EMBEDDING_BACKEND
+    threads = settings.EMBEDDING_THREADS if threads is None else threads
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        return SentenceTransformer(
+            export_quantized_model(model_name),
+            backend="onnx",
+            device="cpu",
+            model_kwargs={
+                "file_name": quantized_file_name(),
+                "provider": "CPUExecutionProvider",
+                "session_options": _session_options(threads),
+            },
+        )
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name or settings.EMBEDDING_MODEL)
@@ -0,0 +1,97 @@
+import re
+
+from backend.config import settings
+from backend.lexical_index import transliterate
+
+# Field-separated ("multi-vector") indexing, INDEX_MODE="fields". Each verse
+# gets one vector per field, stored under "<verse id>#<field>" with the verse
+# id, field name and the verse's field list in metadata. A query searches all
+# field vectors at once and the per-field similarities of each verse are
+# combined with the FIELD_WEIGHT_* settings.
+
+FIELDS = ("translation", "sanskrit", "commentary")
+
+_SPEAKER_LINE = re.compile(r"^[^\n|।॥]*उवाच\s*[|।॥]*\s*$", re.MULTILINE)
+_VERSE_MARKER = re.compile(r"[|।॥]+\s*[०-९\d]+(?:\s*[-.]\s*[०-९\d]+)*\s*[|।॥]+")
+_DANDAS = re.compile(r"[|।॥]+")
+_LEADING_NUMBER = re.compile(r"^\s*\d+(?:\.\d+)+\s+")
+
+
+def field_weights():
+    return {
+        "translation": settings.FIELD_WEIGHT_TRANSLATION,
+        "sanskrit": settings.FIELD_WEIGHT_SANSKRIT,
+        "commentary": settings.FIELD_WEIGHT_COMMENTARY,
+    }
+
+
+def clean_sanskrit(text):
+    """
+    Shloka text for embedding: speaker lines ("धृतराष्ट्र उवाच"), verse
+    numbers and dandas removed, then romanized (IAST), which MiniLM's
+    wordpiece vocabulary splits far less than Devanagari.
+    """
+    text = _SPEAKER_LINE.sub(" ", str(text))
+    text = _DANDAS.sub(" ", _VERSE_MARKER.sub(" ", text))
+    return " ".join(transliterate(text).split())
+
+
+def clean_translation(text):
+    # Some translations repeat the verse number ("1.1 Dhritarashtra said ...")
+    return " ".join(_LEADING_NUMBER.sub("", str(text)).split())
+
+
+def verse_fields(translation, sanskrit, commentary=None):
+    """
+    Embedding inputs of one verse by field; empty fields and fields with a
+    zero weight are left out.
+    """
+    weights = field_weights()
+    texts = {
+        "translation": clean_translation(translation),
+        "sanskrit": clean_sanskrit(sanskrit),
+        "commentary": " ".join(str(commentary).split()) if commentary else "",
+    }
+    return {field: text for field, text in texts.items() if text and text.lower() != "nan" and weights[field] > 0}
+
+
+def field_vector_id(verse_id, field):
+    return f"{verse_id}#{field}"
+
+
+def field_vector_ids(verse_id):
+    return [field_vector_id(verse_id, field) for field in FIELDS]
+
+
+def combine_field_hits(hits, k):
+    """
+    Folds scored field-vector hits into verse candidates.
+
+    A verse's score is the weighted mean of its field similarities over the
+    fields it was indexed with. A field that did not make the over-fetched
+    hit list is counted at the lowest score seen for that field, which
+    bounds its true similarity from above.
+    """
+    weights = field_weights()
+    floor = {}
+    for hit in hits:
+        field = hit["metadata"].get("field")
+        floor[field] = min(floor.get(field, hit["score"]), hit["score"])
+
+    verses = {}
+    for hit in hits:
+        meta = hit["metadata"]
+        verse = verses.setdefault(meta.get("verse_id", hit["id"]), {"hit": hit, "scores": {}})
+        verse["scores"].setdefault(meta.get("field"), hit["score"])
+
+    candidates = []
+    for verse_id, verse in verses.items():
+        fields = [f for f in verse["hit"]["metadata"].get("fields", "").split(",") if weights.get(f)]
+        fields = fields or list(verse["scores"])
+        total = sum(weights.get(f, 0.0) for f in fields) or 1.0
+        score = sum(weights.get(f, 0.0) * verse["scores"].get(f, floor.get(f, 0.0)) for f in fields) / total
+        meta = {key: value for key, value in verse["hit"]["metadata"].items() if key not in ("verse_id", "field", "fields")}
+        candidates.append({"id": verse_id, "document": verse["hit"]["document"], "metadata": meta, "score": score})
+
+    candidates.sort(key=lambda c: c["score"], reverse=True)
+    return candidates[:k]
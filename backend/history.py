@@ -0,0 +1,113 @@
+import re
+from functools import lru_cache
+
+from backend.config import settings
+
+# Footers the frontend appends to assistant messages; they only repeat the
+# verse references and cost prompt tokens on every later turn.
+_REFERENCE_FOOTER = re.compile(r"\s*(?:---\s*)?\*\*📚 (?:Sacred References|Reference):\*\*.*\Z", re.DOTALL)
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """
+    Token count of a string. Uses tiktoken's cl100k_base when available (close
+    enough to Llama's tokenizer for budgeting) and ~4 characters per token
+    otherwise.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4) if text else 0
+
+
+def truncate_to_tokens(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]).rstrip() + "…"
+    return text[:max_tokens * 4].rstrip() + "…"
+
+
+def strip_references(content):
+    return _REFERENCE_FOOTER.sub("", content).strip()
+
+
+def _gist(message, max_tokens=40):
+    """
+    First sentence of a turn, capped, used as its line in the summary.
+    """
+    text = " ".join(message["content"].split())
+    first = _SENTENCE_END.split(text, maxsplit=1)[0]
+    speaker = "User" if message["role"] == "user" else "Saarthi"
+    return f"{speaker}: {truncate_to_tokens(first, max_tokens)}"
+
+
+def summarize_turns(messages, max_tokens):
+    """
+    Extractive rolling summary: one gist line per older turn, keeping the most
+    recent lines that fit in max_tokens.
+    """
+    lines = []
+    used = 0
+    for message in reversed(messages):
+        line = _gist(message)
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens:
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(reversed(lines))
+
+
+def window_history(chat_history, token_budget=None, summary_tokens=None, summarizer=None):
+    """
+    Fits chat history into a fixed token budget.
+
+    Reference footers are stripped, the most recent turns are kept verbatim
+    while they fit in token_budget, and everything older is compacted into a
+    single summary message of at most summary_tokens. A custom
+    summarizer(messages, max_tokens) -> str (e.g. an LLM call) can replace
+    the extractive default.
+    """
+    token_budget = settings.HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+    summary_tokens = settings.HISTORY_SUMMARY_TOKENS if summary_tokens is None else summary_tokens
+    summarizer = summarizer or summarize_turns
+
+    cleaned = [
+        {"role": m["role"], "content": strip_references(m["content"]) if m["role"] == "assistant" else m["content"]}
+        for m in chat_history
+    ]
+
+    recent = []
+    used = 0
+    for message in reversed(cleaned):
+        cost = count_tokens(message["content"]) + 4  # Per-message chat framing
+        if used + cost > token_budget:
+            if not recent:
+                # A single oversized latest turn is truncated rather than dropped
+                message = {"role": message["role"], "content": truncate_to_tokens(message["content"], token_budget - 4)}
+                recent.append(message)
+            break
+        recent.append(message)
+        used += cost
+    recent.reverse()
+
+    older = cleaned[:len(cleaned) - len(recent)]
+    if not older or summary_tokens <= 0:
+        return recent
+
+    summary = summarizer(older, summary_tokens)
+    if not summary:
+        return recent
+    return [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] + recent
@@ -0,0 +1,225 @@
+import os
+import re
+import json
+import math
+import unicodedata
+from collections import Counter, defaultdict
+
+try:
+    from indic_transliteration import sanscript
+except ImportError:  # Optional: without it Devanagari is indexed as-is
+    sanscript = None
+
+INDEX_VERSION = 1
+
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+_TOKEN = re.compile(r"[^\W\d_]+", re.UNICODE)
+_REFERENCE = re.compile(r"(\d+(?:\s*[.:]\s*\d+)+)")
+
+# Romanized Sanskrit is spelled many ways ("nishkama", "niṣkāma", "nishkaama").
+# Both documents and queries are folded to one lossy ASCII form so they meet.
+_FOLDS = [
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"ch"), "c"),
+    (re.compile(r"([bcdgjkpt])h"), r"\1"),
+    (re.compile(r"([aeiou])\1+"), r"\1"),
+    (re.compile(r"ri"), "r"),
+    (re.compile(r"w"), "v"),
+]
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have he his i in is it its of on or that the this "
+    "to was were which who will with you your me my we our they them what how do does".split()
+)
+
+# Term kinds and their weight in the BM25 sum. Character n-grams let sandhi
+# compounds ("yogascittavrttinirodhah") match partial or differently split queries.
+_WORD = "w:"
+_GRAM = "g:"
+_GRAM_WEIGHT = 0.3
+_GRAM_SIZE = 4
+
+SOURCE_ALIASES = {
+    "bhagavad gita": "Bhagavad Gita",
+    "bhagavadgita": "Bhagavad Gita",
+    "gita": "Bhagavad Gita",
+    "bg": "Bhagavad Gita",
+    "yoga sutras": "Yoga Sutras",
+    "yoga sutra": "Yoga Sutras",
+    "ys": "Yoga Sutras",
+    "brahma sutras": "Brahma Sutras",
+    "brahma sutra": "Brahma Sutras",
+    "bs": "Brahma Sutras",
+}
+
+
+def transliterate(text):
+    if sanscript is not None and _DEVANAGARI.search(text):
+        return sanscript.transliterate(text, sanscript.DEVANAGARI, sanscript.IAST)
+    return text
+
+
+def fold(token):
+    token = unicodedata.normalize("NFKD", token)
+    token = "".join(ch for ch in token if not unicodedata.combining(ch)).lower()
+    for pattern, replacement in _FOLDS:
+        token = pattern.sub(replacement, token)
+    return token
+
+
+def tokenize(text, grams=False):
+    """
+    Normalized terms for BM25: folded words, plus character n-grams of long
+    words when grams=True (used for the Sanskrit field and for queries).
+    """
+    terms = []
+    for raw in _TOKEN.findall(transliterate(str(text))):
+        word = fold(raw)
+        if not word or word in _STOPWORDS:
+            continue
+        terms.append(_WORD + word)
+        if grams and len(word) > _GRAM_SIZE:
+            terms.extend(_GRAM + word[i:i + _GRAM_SIZE] for i in range(len(word) - _GRAM_SIZE + 1))
+    return terms
+
+
+def _reference_key(source, chapter, verse):
+    return f"{source}|{str(chapter).strip().lower()}|{str(verse).strip()}"
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over verse translations and Sanskrit text, plus a
+    direct (source, chapter, verse) reference table.
+    """
+
+    def __init__(self, ids, documents, metadatas, postings, doc_lengths, references, k1=1.5, b=0.75):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.postings = postings          # term -> [[doc index, term frequency], ...]
+        self.doc_lengths = doc_lengths
+        self.references = references      # reference key -> doc index
+        self.k1 = k1
+        self.b = b
+        self.avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        self._idf = {
+            term: math.log(1 + (len(ids) - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in postings.items()
+        }
+        self._upanishads = sorted(
+            {str(m.get("chapter", "")).lower() for m in metadatas if m.get("source") == "Upanishads"},
+            key=len, reverse=True,
+        )
+
+    @classmethod
+    def build(cls, rows):
+        """
+        rows: iterable of (verse_id, {"document", "translation", "metadata"}).
+        """
+        ids, documents, metadatas, doc_lengths = [], [], [], []
+        postings = defaultdict(list)
+        references = {}
+
+        for verse_id, row in rows:
+            meta = row["metadata"]
+            terms = tokenize(row["translation"]) + tokenize(meta.get("sanskrit", ""), grams=True)
+            index = len(ids)
+            for term, tf in Counter(terms).items():
+                postings[term].append([index, tf])
+
+            ids.append(verse_id)
+            documents.append(row["document"])
+            metadatas.append({k: meta[k] for k in ("source", "chapter", "verse") if k in meta})
+            doc_lengths.append(len(terms))
+            references[_reference_key(meta.get("source"), meta.get("chapter"), meta.get("verse"))] = index
+
+        return cls(ids, documents, metadatas, dict(postings), doc_lengths, references)
+
+    def save(self, path):
+        payload = {
+            "version": INDEX_VERSION,
+            "ids": self.ids,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+            "references": self.references,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported lexical index version {payload.get('version')}")
+        return cls(payload["ids"], payload["documents"], payload["metadatas"],
+                   payload["postings"], payload["doc_lengths"], payload["references"])
+
+    def search(self, query, k=10, sources=None):
+        """
+        Top-k (doc index, bm25 score) pairs for a free-text query, optionally
+        limited to the given scripture sources.
+        """
+        scores = defaultdict(float)
+        for term, qtf in Counter(tokenize(query, grams=True)).items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            weight = self._idf[term] * (_GRAM_WEIGHT if term.startswith(_GRAM) else 1.0)
+            for index, tf in posting:
+                norm = 1 - self.b + self.b * self.doc_lengths[index] / self.avg_length
+                scores[index] += weight * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        if sources:
+            scores = {i: score for i, score in scores.items() if self.metadatas[i].get("source") in sources}
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def lookup_references(self, query, sources=None):
+        """
+        Doc indexes for explicit references such as "BG 2.47", "Gita 2:47",
+        "Yoga Sutra 1.2" or "Katha Upanishad 1.2.20". A bare "2.47" is read as
+        a Gita reference. Like search(), optionally limited to the given
+        scripture sources.
+        """
+        text = query.lower()
+        numbers = [re.sub(r"\s+", "", m).replace(":", ".") for m in _REFERENCE.findall(text)]
+        if not numbers:
+            return []
+
+        source = next((name for alias, name in SOURCE_ALIASES.items() if re.search(rf"\b{alias}\b", text)), None)
+        upanishad = next((name for name in self._upanishads if name and re.search(rf"\b{re.escape(name)}\b", text)), None)
+
+        hits = []
+        for number in numbers:
+            if upanishad:
+                key = _reference_key("Upanishads", upanishad, number)
+            else:
+                chapter, _, verse = number.partition(".")
+                key = _reference_key(source or "Bhagavad Gita", chapter, verse)
+            index = self.references.get(key)
+            if index is None or index in hits:
+                continue
+            if sources and self.metadatas[index].get("source") not in sources:
+                continue
+            hits.append(index)
+        return hits
+
+    def candidate(self, index):
+        return {"id": self.ids[index], "document": self.documents[index], "metadata": self.metadatas[index]}
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    Returns ids ordered by fused score.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,262 @@
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from backend.config import settings
+from backend import telemetry
+
+
+class LLMUnavailable(Exception):
+    """
+    Raised when no answer could be obtained within the retry/timeout budget.
+    Callers fall back to a retrieval-only answer.
+    """
+
+
+class LLMClient:
+    """
+    Provider interface. complete()/acomplete() return the answer text;
+    stream() yields text chunks. Implementations raise the provider's own
+    exceptions and record token usage through backend.telemetry.
+    """
+
+    def complete(self, messages, model, timeout):
+        raise NotImplementedError
+
+    def stream(self, messages, model, timeout):
+        raise NotImplementedError
+
+    async def acomplete(self, messages, model, timeout):
+        raise NotImplementedError
+
+
+class GroqClient(LLMClient):
+    def __init__(self, client, async_client_factory=None, temperature=None):
+        self.client = client
+        self.async_client_factory = async_client_factory
+        self.temperature = settings.LLM_TEMPERATURE if temperature is None else temperature
+
+    def complete(self, messages, model, timeout):
+        completion = self.client.chat.completions.create(
+            messages=messages, model=model, temperature=self.temperature, timeout=timeout,
+        )
+        telemetry.record_tokens(completion.usage)
+        return completion.choices[0].message.content
+
+    def stream(self, messages, model, timeout):
+        stream = self.client.chat.completions.create(
+            messages=messages, model=model, temperature=self.temperature, timeout=timeout, stream=True,
+        )
+        for chunk in stream:
+            # Groq reports usage on the last chunk under x_groq
+            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+            telemetry.record_tokens(usage)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def acomplete(self, messages, model, timeout):
+        client = self.async_client_factory() if self.async_client_factory else None
+        if client is None:
+            raise LLMUnavailable("No async client configured")
+        completion = await client.chat.completions.create(
+            messages=messages, model=model, temperature=self.temperature, timeout=timeout,
+        )
+        telemetry.record_tokens(completion.usage)
+        return completion.choices[0].message.content
+
+
+def is_retryable(error):
+    """
+    Rate limits, timeouts, connection failures and 5xx responses are worth
+    retrying; bad requests and auth errors are not.
+    """
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+def backoff_delay(attempt, error=None):
+    """
+    Full-jitter exponential backoff, honouring a Retry-After header when the
+    provider sends one.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None:
+        return min(retry_after, settings.LLM_RETRY_MAX_SECONDS)
+    cap = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+class ResilientLLM:
+    """
+    Wraps an LLMClient with per-attempt timeouts, jittered retries on
+    transient errors, an overall LLM_DEADLINE_SECONDS per call, and optional
+    hedging: when the primary model has not answered after
+    LLM_HEDGE_AFTER_SECONDS, the same request also goes to LLM_HEDGE_MODEL
+    and whichever answers first wins. Hedging covers complete() and
+    acomplete() only; stream() always uses the primary model.
+    """
+
+    def __init__(self, client, model=None, hedge_model=None, timeout=None, max_retries=None, hedge_after=None,
+                 deadline=None):
+        self.client = client
+        self.model = model or settings.LLM_MODEL
+        self.hedge_model = settings.LLM_HEDGE_MODEL if hedge_model is None else hedge_model
+        self.timeout = settings.LLM_TIMEOUT_SECONDS if timeout is None else timeout
+        self.max_retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge_after = settings.LLM_HEDGE_AFTER_SECONDS if hedge_after is None else hedge_after
+        self.deadline = settings.LLM_DEADLINE_SECONDS if deadline is None else deadline
+        # Hedged calls run here: a primary and a hedge per admitted call, so
+        # primaries never queue behind each other (queueing would count
+        # against hedge_after). A losing request finishes its current attempt
+        # in the background but is not retried.
+        workers = 2 * (settings.LLM_MAX_CONCURRENT or 16)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="saarthi-llm") \
+            if self.hedge_model else None
+
+    def _expires(self):
+        return time.monotonic() + self.deadline if self.deadline else None
+
+    def _attempt_timeout(self, expires):
+        """
+        Per-attempt timeout, cut to what is left of the call's deadline.
+        """
+        if expires is None:
+            return self.timeout
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            raise LLMUnavailable(f"no answer within {self.deadline}s")
+        return min(self.timeout, remaining)
+
+    def _backoff(self, attempt, error, expires):
+        """
+        Delay before the next attempt, or None when it would overrun the deadline.
+        """
+        delay = backoff_delay(attempt, error)
+        if expires is not None and time.monotonic() + delay >= expires:
+            return None
+        return delay
+
+    def _retrying(self, call, messages, model, expires=None, stop=None):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call(messages, model, self._attempt_timeout(expires))
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = None
+                if attempt < self.max_retries and is_retryable(e) and not (stop and stop.is_set()):
+                    delay = self._backoff(attempt, e, expires)
+                if delay is None:
+                    raise LLMUnavailable(str(e)) from e
+                telemetry.metrics.inc("saarthi_llm_retries_total")
+                time.sleep(delay)
+
+    def _submit(self, model, messages, expires, stop):
+        run = contextvars.copy_context().run
+        return self._executor.submit(run, self._retrying, self.client.complete, messages, model, expires, stop)
+
+    def complete(self, messages):
+        expires = self._expires()
+        if not self.hedge_model:
+            return self._retrying(self.client.complete, messages, self.model, expires)
+
+        stop = threading.Event()  # Set once a winner is in, so the loser stops retrying
+        try:
+            primary = self._submit(self.model, messages, expires, stop)
+            done, _ = wait([primary], timeout=self.hedge_after)
+            if done:
+                return primary.result()
+
+            telemetry.metrics.inc("saarthi_llm_hedges_total")
+            pending = {primary, self._submit(self.hedge_model, messages, expires, stop)}
+            error = None
+            while pending:
+                remaining = None if expires is None else max(0.0, expires - time.monotonic())
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                if not done:
+                    raise LLMUnavailable(f"no answer within {self.deadline}s")
+                for future in done:
+                    try:
+                        return future.result()
+                    except LLMUnavailable as e:
+                        error = e
+            raise error
+        finally:
+            stop.set()
+
+    def stream(self, messages):
+        """
+        Retries only until the first chunk arrives; once text has been shown
+        to the user, a failure ends the stream with LLMUnavailable. Not
+        hedged: the deadline bounds the wait for the first chunk.
+        """
+        expires = self._expires()
+        for attempt in range(self.max_retries + 1):
+            started = False
+            try:
+                for token in self.client.stream(messages, self.model, self._attempt_timeout(expires)):
+                    started = True
+                    yield token
+                return
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = None
+                if not started and attempt < self.max_retries and is_retryable(e):
+                    delay = self._backoff(attempt, e, expires)
+                if delay is None:
+                    raise LLMUnavailable(str(e)) from e
+                telemetry.metrics.inc("saarthi_llm_retries_total")
+                time.sleep(delay)
+
+    async def _aretrying(self, model, messages, expires=None):
+        for attempt in range(self.max_retries + 1):
+            timeout = self._attempt_timeout(expires)
+            try:
+                return await asyncio.wait_for(self.client.acomplete(messages, model, timeout), timeout)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                delay = None
+                if attempt < self.max_retries and is_retryable(e):
+                    delay = self._backoff(attempt, e, expires)
+                if delay is None:
+                    raise LLMUnavailable(str(e) or type(e).__name__) from e
+                telemetry.metrics.inc("saarthi_llm_retries_total")
+                await asyncio.sleep(delay)
+
+    async def acomplete(self, messages):
+        expires = self._expires()
+        if not self.hedge_model:
+            return await self._aretrying(self.model, messages, expires)
+
+        primary = asyncio.ensure_future(self._aretrying(self.model, messages, expires))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return primary.result()
+
+        telemetry.metrics.inc("saarthi_llm_hedges_total")
+        pending = {primary, asyncio.ensure_future(self._aretrying(self.hedge_model, messages, expires))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        return task.result()
+                    except LLMUnavailable as e:
+                        error = e
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
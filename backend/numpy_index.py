@@ -0,0 +1,126 @@
+import os
+import json
+import numpy as np
+
+INDEX_VERSION = 1
+_EMBEDDINGS_FILE = "embeddings.npy"
+_META_FILE = "meta.json"
+
+
+class NumpyVectorIndex:
+    """
+    Exact in-process vector search over the whole corpus.
+
+    All embeddings sit in one contiguous float32 matrix (optionally
+    memory-mapped), and a query is a single matrix product plus
+    np.argpartition. Ranking matches Chroma's default L2 space: minimizing
+    |q - x|^2 is the same as maximizing 2 q.x - |x|^2.
+    """
+
+    def __init__(self, ids, documents, metadatas, matrix):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.matrix = matrix
+        self._half_sq_norms = 0.5 * np.einsum("ij,ij->i", matrix, matrix, dtype=np.float32)
+
+        # Precomputed row masks per source for metadata filtering
+        self._source_masks = {}
+        sources = np.array([m.get("source", "") for m in metadatas], dtype=object)
+        for source in set(sources):
+            self._source_masks[source] = sources == source
+        self._tag_masks = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_collection(cls, collection, page_size=2000):
+        ids, documents, metadatas, vectors = [], [], [], []
+        offset = 0
+        while True:
+            page = collection.get(
+                limit=page_size, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            documents.extend(page["documents"])
+            metadatas.extend(page["metadatas"])
+            vectors.append(np.asarray(page["embeddings"], dtype=np.float32))
+            offset += len(page["ids"])
+
+        matrix = np.ascontiguousarray(np.vstack(vectors)) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return cls(ids, documents, metadatas, matrix)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        # Write both files under temporary names, then swap them in
+        np.save(os.path.join(directory, _EMBEDDINGS_FILE + ".tmp.npy"), self.matrix)
+        with open(os.path.join(directory, _META_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "ids": self.ids, "documents": self.documents,
+                       "metadatas": self.metadatas}, f, ensure_ascii=False)
+        os.replace(os.path.join(directory, _EMBEDDINGS_FILE + ".tmp.npy"), os.path.join(directory, _EMBEDDINGS_FILE))
+        os.replace(os.path.join(directory, _META_FILE + ".tmp"), os.path.join(directory, _META_FILE))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, _META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported numpy index version {meta.get('version')}")
+        matrix = np.load(os.path.join(directory, _EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+        if len(matrix) != len(meta["ids"]):
+            raise ValueError("Numpy index embeddings and metadata are out of step")
+        return cls(meta["ids"], meta["documents"], meta["metadatas"], matrix)
+
+    def _tag_mask(self, tag):
+        mask = self._tag_masks.get(tag)
+        if mask is None:
+            mask = np.array([bool(m.get(tag)) for m in self.metadatas], dtype=bool)
+            self._tag_masks[tag] = mask
+        return mask
+
+    def _mask(self, sources, tag):
+        mask = None
+        if sources:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            for source in sources:
+                source_mask = self._source_masks.get(source)
+                if source_mask is not None:
+                    mask |= source_mask
+        if tag:
+            mask = self._tag_mask(tag) if mask is None else mask & self._tag_mask(tag)
+        return mask
+
+    def search(self, query_embeddings, k=10, sources=None, tag=None):
+        """
+        Top-k neighbours for one or more queries.
+
+        query_embeddings: (dim,) or (n_queries, dim). sources optionally limits
+        results to verses whose metadata 'source' is in the given list, and tag
+        to verses whose metadata has that boolean field set.
+        Returns one list of (row, score) pairs per query, best first.
+        """
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if not len(self.ids):
+            return [[] for _ in queries]
+
+        scores = queries @ self.matrix.T - self._half_sq_norms
+        mask = self._mask(sources, tag)
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+            k = min(k, int(mask.sum()))
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row_scores, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row_scores[candidates])]
+            results.append([(int(i), float(row_scores[i])) for i in ordered])
+        return results
+
+    def candidate(self, row):
+        return {"id": self.ids[row], "document": self.documents[row], "metadata": self.metadatas[row]}
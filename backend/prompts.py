@@ -0,0 +1,101 @@
+from functools import lru_cache
+
+from backend.config import settings
+from backend.history import count_tokens, truncate_to_tokens, window_history
+
+# Prompt assembly. The system prompt holds only static instructions and is
+# byte-identical for a given (mode, language, focus), so the provider can reuse
+# its cached prefix across requests. Everything per-request (history, verses,
+# the question) comes after it, and the question is sent exactly once.
+
+_FOCUS_INSTRUCTIONS = {
+    "Relationships": (
+        "- Focus on Dharma in relationships (Parenting, Marriage, Friendship).\n"
+        "- Draw examples from the Ramayana (Maryada Purushottam Ram) and Mahabharata (Family duty).\n"
+        "- Emphasize empathy, duty (Kartavya), and detachment (Anasakti)."
+    ),
+    "Work/Career": (
+        "- Focus on Karma Yoga, leadership, and focus.\n"
+        "- Quote Chanakya Niti where applicable for strategy.\n"
+        "- Emphasize 'Nishkama Karma' (Action without anxiety for results)."
+    ),
+}
+_DEFAULT_FOCUS_INSTRUCTION = "- Answer generally based on Vedic wisdom."
+
+
+@lru_cache(maxsize=64)
+def system_prompt(mode="Beginner", language="English", focus="General"):
+    """
+    Static instructions for one (mode, language, focus) combination.
+    """
+    lang_instruction = "Answer strictly in Hindi (Devanagari)." if language == "Hindi" else "Answer in English."
+    if mode == "Scholar":
+        tone = "You are a Vedantic Scholar. Use precise Sanskrit terms and deep philosophical rigor."
+    else:
+        tone = "You are a friendly Guide. Use simple analogies and focus on practical application."
+
+    return (
+        "You are 'Saarthi', a wise Vedic Counselor.\n"
+        f"{lang_instruction}\n"
+        f"{tone}\n"
+        f"{_FOCUS_INSTRUCTIONS.get(focus, _DEFAULT_FOCUS_INSTRUCTION)}\n"
+        "\n"
+        "Guidelines:\n"
+        "- The user's message may start with Reference Context: verses retrieved for their question.\n"
+        "- If the context matches, explain it.\n"
+        "- If context is missing, use general Vedic knowledge.\n"
+        "- Be concise and empathetic."
+    )
+
+
+def format_context(verses, token_budget=None):
+    """
+    Context block for the prompt from (reference, text) pairs, best first.
+    The budget is shared evenly by the verses, and a verse that does not fit
+    its share is truncated (its Sanskrit tail goes first, since documents
+    lead with the translation).
+    """
+    token_budget = settings.PROMPT_CONTEXT_TOKENS if token_budget is None else token_budget
+    if not verses:
+        return ""
+    per_verse = max(16, token_budget // len(verses))
+    blocks = []
+    for ref, text in verses:
+        text = " ".join(str(text).split())
+        if token_budget > 0 and count_tokens(text) > per_verse:
+            text = truncate_to_tokens(text, per_verse)
+        blocks.append(f"[{ref}] {text}")
+    return "\n\n".join(blocks)
+
+
+def build_messages(user_query, chat_history, context, mode="Beginner", language="English", focus="General"):
+    """
+    Builds the chat messages sent to the LLM for a query and its retrieved context.
+    """
+    messages = [{"role": "system", "content": system_prompt(mode, language, focus)}]
+    messages.extend(window_history(chat_history))
+    if context:
+        content = f"Reference Context:\n{context}\n\nQuestion: {user_query}"
+    else:
+        content = user_query
+    messages.append({"role": "user", "content": content})
+    return messages
+
+
+def retrieval_only_answer(context, language="English", busy=False):
+    """
+    Answer used when the LLM is unavailable (or, with busy=True, when the
+    request was shed under load): the retrieved verses, quoted.
+    """
+    hindi = language == "Hindi"
+    if busy:
+        reason = ("🙏 अभी बहुत से साधक प्रश्न पूछ रहे हैं।" if hindi
+                  else "🙏 Saarthi is answering many seekers right now.")
+    else:
+        reason = "⚠️ सारथी अभी उत्तर नहीं दे पा रहा है।" if hindi else "⚠️ Saarthi cannot reach its guide right now."
+    if not context:
+        retry = "कृपया थोड़ी देर बाद फिर प्रयास करें।" if hindi else "Please try again in a moment."
+        return f"{reason} {retry}"
+    intro = "इस बीच, शास्त्र यह कहते हैं:" if hindi else "Meanwhile, here is what the scriptures say:"
+    quotes = "\n\n".join(f"> {block}" for block in context.split("\n\n"))
+    return f"{reason} {intro}\n\n{quotes}"
@@ -1,115 +1,653 @@
-import os
-from groq import Groq
-import chromadb
-from sentence_transformers import SentenceTransformer
-from dotenv import load_dotenv
+import math
+import time
+import asyncio
+import contextvars
 
 # 1. SETUP
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# Models and clients live in backend.resources and are loaded on first use,
+# so importing this module is cheap.
+from backend.config import settings
+from backend import telemetry
+from backend.cache import TTLCache, normalize_query
+from backend.answer_cache import AnswerCache
+from backend.prompts import build_messages, format_context, retrieval_only_answer
+from backend.llm import LLMUnavailable
+from backend.admission import Overloaded, SingleFlight
+from backend.lexical_index import reciprocal_rank_fusion
+from backend.verse_store import reference
+from backend.fields import combine_field_hits, field_weights
+from backend.taxonomy import FOCUS_TOPICS, focus_score_field, focus_tag_field
+from backend.resources import (
+    get_embedder,
+    get_cross_encoder,
+    get_collection,
+    get_lexical_index,
+    get_vector_index,
+    get_index_manifest,
+    get_verse_store,
+    get_llm,
+    get_admission_controller,
+    get_answer_cache,
+    get_cpu_executor,
+    get_request_semaphore,
+    refresh_snapshot,
+    pinned_snapshot,
+    warm_up,
+)
 
-try:
-    groq_client = Groq(api_key=GROQ_API_KEY)
-except Exception as e:
-    groq_client = None
+# 2. RERANKING
+_rerank_ms_per_pair = None  # Moving average, used to fit reranking into the latency budget
+_rerank_skips = 0           # Reranks skipped for budget since the last measurement
 
-# 2. VECTOR DB SETUP
-DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'chroma_db')
-chroma_client = chromadb.PersistentClient(path=DB_PATH)
-collection = chroma_client.get_or_create_collection(name="vedic_knowledge")
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+def rerank(query, candidates, top_n, budget_ms=None, focus=None):
+    """
+    Scores (query, verse) pairs with the cross-encoder in a single batched call
+    and returns the top_n candidates, best first.
+
+    With a focus, each verse's focus affinity is added to its relevance
+    probability (the sigmoid of the cross-encoder logit) with
+    FOCUS_BOOST_WEIGHT, the same boost dense search applies to similarity,
+    so the focus still shapes the final ranking after reranking.
+
+    If a budget is given, the candidate list is cut to what the cross-encoder
+    can score in that time (based on recent per-pair cost), and reranking is
+    skipped entirely when not even top_n pairs would fit. Every
+    RERANK_REPROBE_EVERY-th skip still scores top_n pairs, so one slow sample
+    (a GC pause, a busy CPU) does not switch reranking off for good.
+    """
+    global _rerank_ms_per_pair, _rerank_skips
+    model = get_cross_encoder()
+    if model is None or len(candidates) <= 1:
+        return candidates[:top_n]
+
+    if budget_ms is not None and _rerank_ms_per_pair:
+        affordable = int(budget_ms / _rerank_ms_per_pair)
+        if affordable < top_n:
+            _rerank_skips += 1
+            if not settings.RERANK_REPROBE_EVERY or _rerank_skips % settings.RERANK_REPROBE_EVERY:
+                return candidates[:top_n]
+            affordable = top_n  # Re-probe the per-pair cost
+        candidates = candidates[:affordable]
+
+    started = time.perf_counter()
+    scores = model.predict([(query, c["document"]) for c in candidates], batch_size=len(candidates))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    telemetry.record_stage("rerank", elapsed_ms / 1000)
+
+    per_pair = elapsed_ms / len(candidates)
+    _rerank_skips = 0
+    _rerank_ms_per_pair = per_pair if _rerank_ms_per_pair is None else 0.8 * _rerank_ms_per_pair + 0.2 * per_pair
+
+    if focus and settings.FOCUS_BOOST_WEIGHT:
+        field = focus_score_field(focus)
+        scores = [
+            1 / (1 + math.exp(-float(score))) + settings.FOCUS_BOOST_WEIGHT * float(c["metadata"].get(field, 0.0))
+            for score, c in zip(scores, candidates)
+        ]
+    ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True)
+    return [candidates[i] for _, i in ranked[:top_n]]
+
+# 3. QUERY CACHES
+embedding_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL_SECONDS, name="query_embeddings")
+retrieval_cache = TTLCache(settings.QUERY_CACHE_SIZE, settings.QUERY_CACHE_TTL_SECONDS, name="retrieval")
+_served_snapshot = None
+
+def _check_index_generation():
+    """
+    Picks up newly published index snapshots (swapped in by the resources
+    layer) and drops retrieval results cached from older ones.
+    """
+    global _served_snapshot
+    snapshot = refresh_snapshot()
+    snapshot_id = snapshot.id if snapshot else None
+    if snapshot_id != _served_snapshot:
+        retrieval_cache.clear()
+        _served_snapshot = snapshot_id
+
+def embed_query(query):
+    """
+    Returns the query embedding, memoized on the normalized query text.
+    """
+    key = (settings.EMBEDDING_MODEL, normalize_query(query))
+    embedding = embedding_cache.get(key)
+    telemetry.record_cache("query_embeddings", embedding is not None)
+    if embedding is None:
+        with telemetry.stage("embed"):
+            embedding = get_embedder().encode([key[1]])[0].tolist()
+        embedding_cache.set(key, embedding)
+    return embedding
 
-def retrieve_verses(query, n_results=3):
+def embed_queries(queries, batch_size=None):
+    """
+    Batched embed_query(): every query not already cached is encoded in one
+    encoder call, and the results are memoized for the retrievals that follow.
+    """
+    keys = [(settings.EMBEDDING_MODEL, normalize_query(query)) for query in queries]
+    found = {key: embedding_cache.get(key) for key in dict.fromkeys(keys)}
+    missing = [key for key, embedding in found.items() if embedding is None]
+    if missing:
+        with telemetry.stage("embed"):
+            embeddings = get_embedder().encode([key[1] for key in missing], batch_size=batch_size or settings.INGEST_BATCH_SIZE)
+        for key, embedding in zip(missing, embeddings):
+            found[key] = embedding.tolist()
+            embedding_cache.set(key, found[key])
+    return [found[key] for key in keys]
+
+def cache_stats():
+    stats = [embedding_cache.stats(), retrieval_cache.stats()]
+    answer_cache = get_answer_cache()
+    if answer_cache:
+        stats.append(answer_cache.stats())
+    return stats
+
+def _cache_gauges():
+    for stats in cache_stats():
+        labels = {"cache": stats["name"]}
+        yield "saarthi_cache_size", stats["size"], labels
+        yield "saarthi_cache_hit_ratio", round(stats["hit_ratio"], 4), labels
+    admission = get_admission_controller()
+    if admission:
+        stats = admission.stats()
+        yield "saarthi_llm_active", stats["active"], {}
+        yield "saarthi_llm_waiting", stats["waiting"], {}
+
+telemetry.metrics.register_gauges(_cache_gauges)
+
+def retrieve_verses(query, n_results=None, source_filter=None, focus=None):
     """
     Finds the most relevant verses from the Vector DB.
+
+    With reranking enabled this is two-stage: over-fetch RERANK_CANDIDATES
+    verses by vector similarity, then keep the best n_results according to
+    the cross-encoder. In hybrid mode the first stage also fuses BM25 hits
+    and pins explicit verse references. Results are cached per normalized query.
+
+    source_filter limits the search to the given scriptures (see
+    taxonomy.SCRIPTURE_SOURCES). focus (e.g. "Work/Career") boosts verses by
+    their index-time affinity to that topic, or restricts the search to
+    verses tagged with it when FOCUS_PREFILTER is set.
     """
-    try:
-        query_embedding = embedder.encode([query]).tolist()
-        results = collection.query(
-            query_embeddings=query_embedding,
-            n_results=n_results
+    n_results = n_results or settings.RETRIEVAL_TOP_N
+    source_filter = tuple(sorted(source_filter)) if source_filter else None
+    focus = focus if focus in FOCUS_TOPICS else None
+    _check_index_generation()
+
+    # One snapshot for the whole query, even if a newer one is swapped in meanwhile
+    with pinned_snapshot() as snapshot:
+        key = _retrieval_key(snapshot, query, n_results, source_filter, focus)
+        cached = retrieval_cache.get(key)
+        telemetry.record_cache("retrieval", cached is not None)
+        if cached is not None:
+            context_text, sources = cached
+            return context_text, list(sources)
+
+        context_text, sources = _retrieve_uncached(query, n_results, source_filter, focus)
+        if sources:
+            retrieval_cache.set(key, (context_text, tuple(sources)))
+        return context_text, sources
+
+def _retrieval_key(snapshot, query, n_results, source_filter, focus):
+    return (snapshot.id if snapshot else None, normalize_query(query), n_results, source_filter, focus,
+            settings.RETRIEVAL_BACKEND, settings.RETRIEVAL_MODE, settings.RERANK_ENABLED,
+            settings.PROMPT_CONTEXT_TOKENS, tuple(field_weights().values()))
+
+def retrieve_batch(requests, n_results=None):
+    """
+    retrieve_verses() for many (query, source_filter, focus) requests at once.
+    Uncached queries are embedded in one encoder call, and the vector search
+    runs once per distinct (source_filter, focus) with all of its queries;
+    fusion and reranking then run per query. Results are returned in order
+    and stored in the retrieval cache, so later retrieve_verses() calls for
+    the same queries are cache hits.
+    """
+    n_results = n_results or settings.RETRIEVAL_TOP_N
+    requests = [(query, tuple(sorted(source_filter)) if source_filter else None, focus if focus in FOCUS_TOPICS else None)
+                for query, source_filter, focus in requests]
+    _check_index_generation()
+
+    with pinned_snapshot() as snapshot:
+        results = [None] * len(requests)
+        groups = {}
+        for i, (query, source_filter, focus) in enumerate(requests):
+            cached = retrieval_cache.get(_retrieval_key(snapshot, query, n_results, source_filter, focus))
+            if cached is not None:
+                results[i] = (cached[0], list(cached[1]))
+            else:
+                groups.setdefault((source_filter, focus), []).append(i)
+
+        pending = [i for rows in groups.values() for i in rows]
+        embeddings = dict(zip(pending, embed_queries([requests[i][0] for i in pending])))
+        for (source_filter, focus), rows in groups.items():
+            dense = dense_search_many([embeddings[i] for i in rows], _fetch_k(n_results), source_filter, focus)
+            for i, candidates in zip(rows, dense):
+                query = requests[i][0]
+                context_text, sources = _retrieve_uncached(query, n_results, source_filter, focus, dense=candidates)
+                if sources:
+                    retrieval_cache.set(_retrieval_key(snapshot, query, n_results, source_filter, focus),
+                                        (context_text, tuple(sources)))
+                results[i] = (context_text, sources)
+        return results
+
+def _chroma_where(source_filter, tag):
+    clauses = []
+    if source_filter:
+        clauses.append({"source": {"$in": list(source_filter)}})
+    if tag:
+        clauses.append({tag: True})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def dense_search(query_embedding, k, source_filter=None, focus=None):
+    """
+    Nearest verses to an embedding from the configured backend: the
+    in-process numpy index when RETRIEVAL_BACKEND="numpy" (and it exists),
+    otherwise Chroma with a metadata `where` prefilter.
+
+    Candidates carry a "score" of 1 - L2^2 / 2 (cosine similarity for the
+    unit-length MiniLM embeddings). On a field-separated index it is the
+    weighted mean of the verse's field scores (see backend.fields). With a
+    focus, that score is boosted by the verse's focus affinity and the list
+    is re-sorted.
+    """
+    return dense_search_many([query_embedding], k, source_filter=source_filter, focus=focus)[0]
+
+def dense_search_many(query_embeddings, k, source_filter=None, focus=None):
+    """
+    dense_search() for several queries sharing one filter: one vector search
+    call (a single matrix product on the numpy backend) for all of them.
+    Returns one candidate list per embedding.
+    """
+    with telemetry.stage("vector_search"):
+        results = _dense_candidates(query_embeddings, k, source_filter, focus)
+
+    if focus and settings.FOCUS_BOOST_WEIGHT:
+        field = focus_score_field(focus)
+        for candidates in results:
+            for c in candidates:
+                c["score"] += settings.FOCUS_BOOST_WEIGHT * float(c["metadata"].get(field, 0.0))
+            candidates.sort(key=lambda c: c["score"], reverse=True)
+    return results
+
+def _field_vectors():
+    # The served snapshot's layout, which may lag behind a changed INDEX_MODE
+    manifest = get_index_manifest() or {}
+    return str(manifest.get("index_mode", "single")).startswith("fields")
+
+def _dense_candidates(query_embeddings, k, source_filter, focus):
+    tag = focus_tag_field(focus) if focus and settings.FOCUS_PREFILTER else None
+    if _field_vectors():
+        # One pass over all field vectors, over-fetched so most candidate
+        # verses come back with every field scored
+        hits = _search_vectors(query_embeddings, k * settings.FIELD_CANDIDATE_MULTIPLIER, source_filter, tag)
+        return [combine_field_hits(query_hits, k) for query_hits in hits]
+    return _search_vectors(query_embeddings, k, source_filter, tag)
+
+def _search_vectors(query_embeddings, k, source_filter, tag):
+    results = None
+    if settings.RETRIEVAL_BACKEND == "numpy":
+        index = get_vector_index()
+        if index is not None:
+            results = []
+            for embedding, hits in zip(query_embeddings, index.search(query_embeddings, k, sources=source_filter, tag=tag)):
+                # The index scores q.x - |x|^2 / 2, i.e. (|q|^2 - L2^2) / 2
+                half_sq_norm = 0.5 * sum(v * v for v in embedding)
+                results.append([{**index.candidate(row), "score": 1 - half_sq_norm + score} for row, score in hits])
+
+    if results is None:
+        collection = get_collection()
+        if collection is None:
+            return [[] for _ in query_embeddings]  # No index published yet: answer without retrieved context
+        response = collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=k,
+            where=_chroma_where(source_filter, tag),
         )
-        
-        context_text = ""
-        sources = []
-        
-        if results['documents']:
-            for i, doc in enumerate(results['documents'][0]):
-                meta = results['metadatas'][0][i]
-                ref = f"{meta.get('source', 'Scripture')} {meta.get('chapter', '?')}.{meta.get('verse', '?')}"
-                context_text += f"[{ref}] {doc}\n\n"
-                sources.append(ref)
-                
+
+        results = [[] for _ in query_embeddings]
+        for candidates, ids, docs, metas, distances in zip(results, response['ids'] or [], response['documents'] or [],
+                                                           response['metadatas'] or [], response['distances'] or []):
+            for verse_id, doc, meta, distance in zip(ids, docs, metas, distances):
+                candidates.append({"id": verse_id, "document": doc, "metadata": meta, "score": 1 - distance / 2})
+    return results
+
+def _tagged_ids(verse_ids, tag):
+    """
+    The verse ids among verse_ids whose metadata sets the focus tag. The
+    lexical index carries no focus metadata, so its hits are checked
+    against the collection.
+    """
+    collection = get_collection()
+    if collection is None or not verse_ids:
+        return set()
+    if _field_vectors():
+        response = collection.get(where={"$and": [{"verse_id": {"$in": list(verse_ids)}}, {tag: True}]},
+                                  include=["metadatas"])
+        return {meta["verse_id"] for meta in response["metadatas"]}
+    return set(collection.get(ids=list(verse_ids), where={tag: True}, include=[])["ids"])
+
+def _fuse_lexical(query, dense, fetch_k, source_filter=None, focus=None):
+    """
+    Hybrid stage: merges dense candidates with BM25 hits by reciprocal-rank
+    fusion. Explicit references ("BG 2.47") are returned separately so they
+    can be pinned ahead of everything else. Both follow the dense search's
+    filters: the source filter, and the focus tag under FOCUS_PREFILTER.
+    """
+    index = get_lexical_index()
+    if index is None:
+        return [], dense
+
+    with telemetry.stage("lexical_search"):
+        pinned = [index.candidate(i) for i in index.lookup_references(query, sources=source_filter)]
+        lexical = [index.candidate(i) for i, _ in index.search(query, fetch_k, sources=source_filter)]
+        if focus and settings.FOCUS_PREFILTER:
+            tagged = _tagged_ids({c["id"] for c in pinned + lexical}, focus_tag_field(focus))
+            pinned = [c for c in pinned if c["id"] in tagged]
+            lexical = [c for c in lexical if c["id"] in tagged]
+
+    by_id = {c["id"]: c for c in pinned + lexical}
+    by_id.update({c["id"]: c for c in dense})  # Dense hits carry the full metadata
+    pinned_ids = {c["id"] for c in pinned}
+    fused = reciprocal_rank_fusion(
+        [[c["id"] for c in dense], [c["id"] for c in lexical]], k=settings.HYBRID_RRF_K
+    )
+    return [by_id[i] for i in by_id if i in pinned_ids], [by_id[i] for i in fused if i not in pinned_ids]
+
+def _verse_reference(candidate, store):
+    """
+    Citation for a candidate, resolved through the verse store; Chroma
+    metadata is only used for verses the store does not have.
+    """
+    verse = store.get(candidate["id"]) if store else None
+    if verse:
+        return verse["ref"]
+    meta = candidate["metadata"]
+    return reference(meta.get('source'), meta.get('chapter'), meta.get('verse'))
+
+def _fetch_k(n_results):
+    # Over-fetch for the reranker and for fusion
+    if settings.RERANK_ENABLED or settings.RETRIEVAL_MODE == "hybrid":
+        return max(n_results, settings.RERANK_CANDIDATES)
+    return n_results
+
+def _retrieve_uncached(query, n_results, source_filter=None, focus=None, dense=None):
+    """
+    dense: this query's dense_search() candidates, when already computed in a batch.
+    """
+    try:
+        started = time.perf_counter()
+        use_rerank = settings.RERANK_ENABLED
+        hybrid = settings.RETRIEVAL_MODE == "hybrid"
+        fetch_k = _fetch_k(n_results)
+
+        candidates = dense if dense is not None else \
+            dense_search(embed_query(query), fetch_k, source_filter=source_filter, focus=focus)
+
+        pinned = []
+        if hybrid:
+            pinned, candidates = _fuse_lexical(query, candidates, fetch_k, source_filter=source_filter, focus=focus)
+        pinned = pinned[:n_results]
+        remaining = n_results - len(pinned)
+
+        if use_rerank and remaining:
+            spent_ms = (time.perf_counter() - started) * 1000
+            candidates = rerank(query, candidates, remaining, budget_ms=settings.RERANK_LATENCY_BUDGET_MS - spent_ms,
+                                focus=focus)
+        else:
+            candidates = candidates[:remaining]
+        candidates = pinned + candidates
+
+        store = get_verse_store()
+        sources = [_verse_reference(c, store) for c in candidates]
+        context_text = format_context(list(zip(sources, (c["document"] for c in candidates))))
         return context_text, sources
     except Exception as e:
-        print(f"Retrieval Error: {e}")
+        telemetry.record_error("retrieval", e)
         return "", []
 
-def generate_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General"):
+# 4. GENERATION
+def _lookup_cached_answer(user_query, chat_history, mode, language, focus, source_filter=None):
+    """
+    Semantic answer cache (only for standalone questions; history changes the answer).
+    Returns (cached, cache_scope, query_embedding); cache_scope is None when
+    the answer should not be stored afterwards.
+    """
+    answer_cache = get_answer_cache()
+    if not answer_cache or chat_history:
+        return None, None, None
+    try:
+        # The corpus hash retires cached answers (and their sources) on re-index
+        cache_scope = AnswerCache.scope(mode, language, focus, sorted(source_filter or []),
+                                        settings.LLM_MODEL, settings.EMBEDDING_MODEL,
+                                        (get_index_manifest() or {}).get("corpus_hash"))
+        query_embedding = embed_query(user_query)
+        with telemetry.stage("answer_cache"):
+            cached = answer_cache.lookup(query_embedding, cache_scope)
+        telemetry.record_cache("answers", cached is not None)
+        return cached, cache_scope, query_embedding
+    except Exception as e:
+        telemetry.record_error("answer_cache", e)
+        return None, None, None
+
+def _store_answer(user_query, query_embedding, cache_scope, answer, sources):
+    if cache_scope and answer:
+        try:
+            get_answer_cache().store(user_query, query_embedding, cache_scope, answer, sources)
+        except Exception as e:
+            telemetry.record_error("answer_cache", e)
+
+single_flight = SingleFlight()
+
+def _flight_key(user_query, chat_history, mode, language, focus, source_filter):
+    """
+    Key under which identical in-flight requests are coalesced, or None when
+    the request must run on its own (history makes every answer different).
+    """
+    if not settings.SINGLE_FLIGHT_ENABLED or chat_history:
+        return None
+    return (normalize_query(user_query), mode, language, focus, tuple(sorted(source_filter or [])), settings.LLM_MODEL)
+
+def generate_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General", source_filter=None):
     """
     Generates an answer with specific Focus Modes (Relationships, Work, etc.)
+    Identical standalone questions already in flight share one upstream call.
+    """
+    with telemetry.trace("generate_answer", mode=mode, language=language, focus=focus):
+        key = _flight_key(user_query, chat_history, mode, language, focus, source_filter)
+        if key is None:
+            return _generate_answer(user_query, chat_history, mode, language, focus, source_filter)
+        (answer, sources), shared = single_flight.do(
+            key, lambda: _generate_answer(user_query, chat_history, mode, language, focus, source_filter)
+        )
+        telemetry.record_cache("single_flight", shared)
+        return answer, list(sources)
+
+def _llm_failure(error, context, language):
+    """
+    Error handling for an unavailable LLM: quote the retrieved verses when
+    fallback is enabled, otherwise report the error.
     """
-    if not groq_client:
+    telemetry.record_error("llm", error)
+    if isinstance(error, Overloaded):
+        # Shed under load: always say so plainly rather than show an error
+        return retrieval_only_answer(context if settings.LLM_FALLBACK_ENABLED else "", language, busy=True)
+    if settings.LLM_FALLBACK_ENABLED:
+        telemetry.metrics.inc("saarthi_llm_fallbacks_total")
+        return retrieval_only_answer(context, language)
+    return f"Error connecting to AI: {error}"
+
+def _generate_answer(user_query, chat_history, mode, language, focus, source_filter):
+    llm = get_llm()
+    if not llm:
         return "⚠️ System Error: GROQ_API_KEY is missing.", []
 
+    # 0. Semantic answer cache
+    cached, cache_scope, query_embedding = _lookup_cached_answer(user_query, chat_history, mode, language, focus, source_filter)
+    if cached:
+        answer, sources, _ = cached
+        return answer, sources
+
     # 1. Retrieve Context
-    context, sources = retrieve_verses(user_query)
-    
-    # 2. Language Setup
-    lang_instruction = "Answer strictly in Hindi (Devanagari)." if language == "Hindi" else "Answer in English."
-
-    # 3. Tone & Focus Setup
-    if mode == "Scholar":
-        tone = "You are a Vedantic Scholar. Use precise Sanskrit terms and deep philosophical rigor."
-    else:
-        tone = "You are a friendly Guide. Use simple analogies and focus on practical application."
-
-    # Focus Mode Logic (The New Feature)
-    if focus == "Relationships":
-        focus_instruction = """
-        - Focus on Dharma in relationships (Parenting, Marriage, Friendship).
-        - Draw examples from the Ramayana (Maryada Purushottam Ram) and Mahabharata (Family duty).
-        - Emphasize empathy, duty (Kartavya), and detachment (Anasakti).
-        """
-    elif focus == "Work/Career":
-        focus_instruction = """
-        - Focus on Karma Yoga, leadership, and focus.
-        - Quote Chanakya Niti where applicable for strategy.
-        - Emphasize 'Nishkama Karma' (Action without anxiety for results).
-        """
-    else:
-        focus_instruction = "- Answer generally based on Vedic wisdom."
-
-    # 4. Construct Prompt
-    system_prompt = f"""
-    You are 'Saarthi', a wise Vedic Counselor.
-    {lang_instruction}
-    {tone}
-    {focus_instruction}
-    
-    Reference Context:
-    {context}
-    
-    User Query: {user_query}
+    with telemetry.stage("retrieval"):
+        context, sources = retrieve_verses(user_query, source_filter=source_filter, focus=focus)
+    with telemetry.stage("prompt_build"):
+        messages = build_messages(user_query, chat_history, context, mode=mode, language=language, focus=focus)
     
-    Guidelines:
-    - If the context matches, explain it.
-    - If context is missing, use general Vedic knowledge.
-    - Be concise and empathetic.
+    # 5. Call LLM (queued behind the admission controller)
+    try:
+        with get_admission_controller().admit(), telemetry.stage("llm"):
+            answer = llm.complete(messages)
+    except (LLMUnavailable, Overloaded) as e:
+        return _llm_failure(e, context, language), sources
+    _store_answer(user_query, query_embedding, cache_scope, answer, sources)
+    return answer, sources
+
+def stream_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General", source_filter=None):
     """
-    
-    messages = [{"role": "system", "content": system_prompt}]
-    messages.extend(chat_history)
-    messages.append({"role": "user", "content": user_query})
-    
-    # 5. Call LLM
+    Streaming variant of generate_answer().
+    Yields the answer as text chunks while the LLM produces them, then yields
+    the list of source references as the final item.
+    """
+    with telemetry.trace("stream_answer", mode=mode, language=language, focus=focus):
+        key = _flight_key(user_query, chat_history, mode, language, focus, source_filter)
+        if key is None:
+            yield from _stream_answer(user_query, chat_history, mode, language, focus, source_filter)
+            return
+        tokens, shared = single_flight.stream(
+            key, lambda: _stream_answer(user_query, chat_history, mode, language, focus, source_filter)
+        )
+        telemetry.record_cache("single_flight", shared)
+        for item in tokens:
+            yield list(item) if isinstance(item, list) else item
+
+def _stream_answer(user_query, chat_history, mode, language, focus, source_filter):
+    llm = get_llm()
+    if not llm:
+        yield "⚠️ System Error: GROQ_API_KEY is missing."
+        yield []
+        return
+
+    cached, cache_scope, query_embedding = _lookup_cached_answer(user_query, chat_history, mode, language, focus, source_filter)
+    if cached:
+        answer, sources, _ = cached
+        yield answer
+        yield sources
+        return
+
+    with telemetry.stage("retrieval"):
+        context, sources = retrieve_verses(user_query, source_filter=source_filter, focus=focus)
+    with telemetry.stage("prompt_build"):
+        messages = build_messages(user_query, chat_history, context, mode=mode, language=language, focus=focus)
+
+    parts = []
+    started = time.perf_counter()
+    try:
+        with get_admission_controller().admit():
+            for token in llm.stream(messages):
+                if not parts:
+                    telemetry.record_stage("llm_first_token", time.perf_counter() - started)
+                parts.append(token)
+                yield token
+    except (LLMUnavailable, Overloaded) as e:
+        # Mid-stream failures keep what was shown and are not cached
+        yield ("\n\n" if parts else "") + _llm_failure(e, context, language)
+        yield sources
+        return
+    finally:
+        # Includes time the consumer spends between chunks, as the user sees it
+        telemetry.record_stage("llm", time.perf_counter() - started)
+
+    _store_answer(user_query, query_embedding, cache_scope, "".join(parts), sources)
+    yield sources
+
+# 5. ASYNC API
+def _run_in_executor(loop, func, *args):
+    """
+    run_in_executor() that carries the caller's context (and so its trace)
+    into the worker thread.
+    """
+    return loop.run_in_executor(get_cpu_executor(), contextvars.copy_context().run, func, *args)
+
+async def aretrieve_verses(query, n_results=None, source_filter=None, focus=None, timeout=None):
+    """
+    Async retrieve_verses(). Embedding, vector search and reranking run on the
+    shared bounded executor so the event loop stays free; returns no context
+    if they exceed the timeout.
+    """
+    timeout = settings.ASYNC_RETRIEVAL_TIMEOUT_SECONDS if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b-versatile",
-            temperature=0.6,
+        return await asyncio.wait_for(
+            _run_in_executor(loop, retrieve_verses, query, n_results, source_filter, focus),
+            timeout,
         )
-        answer = chat_completion.choices[0].message.content
-        return answer, sources
-    except Exception as e:
-        return f"Error connecting to AI: {e}", []
\ No newline at end of file
+    except asyncio.TimeoutError:
+        telemetry.record_error("retrieval", f"timed out after {timeout}s")
+        return "", []
+    finally:
+        telemetry.record_stage("retrieval", time.perf_counter() - started)
+
+async def agenerate_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General",
+                           source_filter=None, timeout=None, return_error=False):
+    """
+    Async generate_answer() for serving many conversations from one process.
+    The answer-cache lookup and retrieval run concurrently, the LLM call goes
+    through the pooled AsyncGroq client, and at most ASYNC_MAX_CONCURRENCY
+    requests are in flight per event loop.
+
+    With return_error=True, returns (answer, sources, error), where error
+    describes why no LLM answer was produced (None on success). It is
+    shared with every caller coalesced onto the same flight.
+    """
+    with telemetry.trace("agenerate_answer", mode=mode, language=language, focus=focus):
+        key = _flight_key(user_query, chat_history, mode, language, focus, source_filter)
+        if key is None:
+            answer, sources, error = await _agenerate_answer(user_query, chat_history, mode, language, focus,
+                                                             source_filter, timeout)
+        else:
+            (answer, sources, error), shared = await single_flight.ado(
+                key, lambda: _agenerate_answer(user_query, chat_history, mode, language, focus, source_filter, timeout)
+            )
+            telemetry.record_cache("single_flight", shared)
+            sources = list(sources)
+        return (answer, sources, error) if return_error else (answer, sources)
+
+async def _agenerate_answer(user_query, chat_history, mode, language, focus, source_filter, timeout):
+    """
+    Returns (answer, sources, error); error is None when the answer came
+    from the LLM or the answer cache.
+    """
+    llm = get_llm()
+    if not llm:
+        return "⚠️ System Error: GROQ_API_KEY is missing.", [], "GROQ_API_KEY is missing"
+
+    timeout = settings.ASYNC_LLM_TIMEOUT_SECONDS if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+
+    queued = time.perf_counter()
+    async with get_request_semaphore():
+        telemetry.record_stage("queue", time.perf_counter() - queued)
+        (cached, cache_scope, query_embedding), (context, sources) = await asyncio.gather(
+            _run_in_executor(loop, _lookup_cached_answer, user_query, chat_history, mode, language, focus, source_filter),
+            aretrieve_verses(user_query, source_filter=source_filter, focus=focus),
+        )
+        if cached:
+            answer, cached_sources, _ = cached
+            return answer, cached_sources, None
+
+        with telemetry.stage("prompt_build"):
+            messages = build_messages(user_query, chat_history, context, mode=mode, language=language, focus=focus)
+        try:
+            async with get_admission_controller().aadmit():
+                with telemetry.stage("llm"):
+                    # Overall deadline across retries and hedging
+                    answer = await asyncio.wait_for(llm.acomplete(messages), timeout)
+        except asyncio.TimeoutError:
+            error = f"no response within {timeout}s"
+            return _llm_failure(error, context, language), sources, error
+        except (LLMUnavailable, Overloaded) as e:
+            return _llm_failure(e, context, language), sources, f"{type(e).__name__}: {e}"
+
+    await _run_in_executor(loop, _store_answer, user_query, query_embedding, cache_scope, answer, sources)
+    return answer, sources, None
@@ -0,0 +1,367 @@
+import os
+import time
+import asyncio
+import weakref
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+from backend.config import settings
+
+# Process-wide registry of heavy resources. Nothing is created at import time;
+# each resource is built on first use (or by warm_up()) and then shared by every
+# caller in the process, including all Streamlit sessions.
+_resources = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_FAILED = object()
+
+# Seconds spent constructing each resource, for cold-start visibility.
+load_times = {}
+
+
+def _get(name, factory):
+    value = _resources.get(name)
+    if value is None:
+        with _registry_lock:
+            lock = _locks.setdefault(name, threading.Lock())
+        with lock:
+            value = _resources.get(name)
+            if value is None:
+                started = time.perf_counter()
+                try:
+                    value = factory()
+                except Exception as e:
+                    print(f"Resource Load Error ({name}): {e}")
+                    value = _FAILED
+                load_times[name] = time.perf_counter() - started
+                _resources[name] = value
+    return None if value is _FAILED else value
+
+
+def reset(*names):
+    """
+    Drops cached resources so the next use reloads them (e.g. after a re-index).
+    """
+    for name in names:
+        _resources.pop(name, None)
+
+
+def get_embedder():
+    """
+    Query encoder for EMBEDDING_BACKEND. If the int8 ONNX model cannot be
+    exported or loaded, queries are encoded by the FP32 model instead.
+    """
+    def load():
+        from backend.embeddings import load_embedder
+        if settings.EMBEDDING_BACKEND != "torch":
+            try:
+                return load_embedder()
+            except Exception as e:
+                print(f"⚠️  {settings.EMBEDDING_BACKEND} embedder unavailable ({e}), using the FP32 model.")
+        return load_embedder("torch")
+    return _get("embedder", load)
+
+
+def get_cross_encoder():
+    """
+    Returns None if the cross-encoder cannot be loaded, in which case
+    retrieval falls back to vector order.
+    """
+    def load():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(settings.RERANKING_MODEL)
+    return _get("cross_encoder", load)
+
+
+# Index resources are loaded per snapshot (see backend.snapshots) under names
+# like "collection@<snapshot id>". Requests use the active snapshot; when a new
+# one is published it is loaded in the background and swapped in atomically,
+# while requests already running keep the objects they hold.
+_active_snapshot = None
+_snapshot_marker = False  # False = never checked
+_swap_lock = threading.Lock()
+_swapping = None
+_pinned_snapshot = contextvars.ContextVar("saarthi_pinned_snapshot", default=None)
+
+
+def active_snapshot():
+    return _pinned_snapshot.get() or _active_snapshot
+
+
+@contextmanager
+def pinned_snapshot():
+    """
+    Keeps every index lookup inside the block on one snapshot, even if a
+    swap happens meanwhile. Yields that snapshot (None if there is no index).
+    """
+    snapshot = active_snapshot()
+    token = _pinned_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _pinned_snapshot.reset(token)
+
+
+def _snapshot_resource(kind, factory):
+    snapshot = active_snapshot()
+    if snapshot is None:
+        return None
+    return _get(f"{kind}@{snapshot.id}", lambda: factory(snapshot))
+
+
+def _preload(snapshot):
+    """
+    Loads a snapshot's index resources so the first query after the swap
+    does not pay for it.
+    """
+    token = _pinned_snapshot.set(snapshot)
+    try:
+        get_collection()
+        get_lexical_index()
+        get_verse_store()
+        get_index_manifest()
+        if settings.RETRIEVAL_BACKEND == "numpy":
+            get_vector_index()
+    finally:
+        _pinned_snapshot.reset(token)
+
+
+def _activate(snapshot):
+    global _active_snapshot, _swapping
+    _preload(snapshot)
+    previous = _active_snapshot
+    _active_snapshot = snapshot
+    _swapping = None
+    print(f"📦 Serving index snapshot {snapshot.id}")
+    # Keep the previous snapshot's objects for requests still using them; drop anything older
+    keep = {snapshot.id} | ({previous.id} if previous else set())
+    for name in list(_resources):
+        if "@" in name and name.split("@", 1)[1] not in keep:
+            _resources.pop(name, None)
+
+
+def refresh_snapshot():
+    """
+    Checks whether a new snapshot has been published and returns the active
+    one. The first snapshot is loaded synchronously; later ones are loaded on
+    a background thread and swapped in when ready, so queries never wait on
+    a re-index.
+    """
+    global _snapshot_marker, _swapping
+    from backend import snapshots
+
+    marker = snapshots.current_marker()
+    if marker == _snapshot_marker:
+        return _active_snapshot
+
+    with _swap_lock:
+        if marker == _snapshot_marker:
+            return _active_snapshot
+        _snapshot_marker = marker
+        snapshot = snapshots.read_current()
+        if snapshot is None or (_active_snapshot and snapshot.id == _active_snapshot.id) or snapshot.id == _swapping:
+            return _active_snapshot
+        if _active_snapshot is None:
+            _activate(snapshot)
+        else:
+            _swapping = snapshot.id
+            threading.Thread(target=_activate, args=(snapshot,), daemon=True, name="saarthi-snapshot").start()
+    return _active_snapshot
+
+
+def get_chroma_client():
+    def load(snapshot):
+        import chromadb
+        return chromadb.PersistentClient(path=snapshot.chroma_path)
+    return _snapshot_resource("chroma_client", load)
+
+
+def get_collection():
+    """
+    Returns None when no index has been built yet.
+    """
+    def load(snapshot):
+        return get_chroma_client().get_collection(name=settings.COLLECTION_NAME)
+    return _snapshot_resource("collection", load)
+
+
+def get_lexical_index():
+    """
+    BM25/reference index for hybrid retrieval. Returns None if it has not been
+    built yet, in which case retrieval is dense-only.
+    """
+    def load(snapshot):
+        from backend.lexical_index import LexicalIndex
+        return LexicalIndex.load(snapshot.lexical_index_path)
+    return _snapshot_resource("lexical_index", load)
+
+
+def get_vector_index():
+    """
+    In-process numpy vector index (RETRIEVAL_BACKEND="numpy"). Returns None if
+    it has not been exported yet, in which case retrieval uses Chroma.
+    """
+    def load(snapshot):
+        from backend.numpy_index import NumpyVectorIndex
+        return NumpyVectorIndex.load(snapshot.numpy_index_dir, mmap=settings.NUMPY_INDEX_MMAP)
+    return _snapshot_resource("vector_index", load)
+
+
+def get_verse_store():
+    """
+    Columnar store of every verse, for lookups by reference and the verse of
+    the day. Returns None if it has not been built yet.
+    """
+    def load(snapshot):
+        from backend.verse_store import VerseStore
+        return VerseStore.load(snapshot.verse_store_path)
+    return _snapshot_resource("verse_store", load)
+
+
+def get_index_manifest():
+    """
+    Build manifest of the active snapshot (index layout, model, corpus hash);
+    empty if it has none.
+    """
+    return _snapshot_resource("manifest", lambda snapshot: snapshot.manifest() or {})
+
+
+def get_groq_client():
+    """
+    Returns None when GROQ_API_KEY is missing.
+    """
+    def load():
+        from groq import Groq
+        # Retries and timeouts are handled by backend.llm, not the SDK
+        return Groq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0, timeout=settings.LLM_TIMEOUT_SECONDS)
+    return _get("groq_client", load)
+
+
+def get_llm():
+    """
+    Resilient LLM client (retries, timeouts, hedging) over Groq.
+    Returns None when GROQ_API_KEY is missing.
+    """
+    def load():
+        from backend.llm import GroqClient, ResilientLLM
+        client = get_groq_client()
+        if client is None:
+            raise RuntimeError("GROQ_API_KEY is missing")
+        return ResilientLLM(GroqClient(client, async_client_factory=get_async_groq_client))
+    return _get("llm", load)
+
+
+def get_cpu_executor():
+    """
+    Bounded thread pool the async API uses for blocking work (embedding,
+    Chroma queries, reranking), so concurrency never turns into one thread
+    per request.
+    """
+    def load():
+        return ThreadPoolExecutor(max_workers=settings.ASYNC_CPU_WORKERS, thread_name_prefix="saarthi-cpu")
+    return _get("cpu_executor", load)
+
+
+# Async clients and semaphores are bound to the event loop that created them,
+# so they are kept per loop rather than per process.
+_loop_resources = weakref.WeakKeyDictionary()
+
+
+def _get_loop_local(name, factory):
+    loop = asyncio.get_running_loop()
+    state = _loop_resources.setdefault(loop, {})
+    if name not in state:
+        state[name] = factory()
+    return state[name]
+
+
+def get_async_groq_client():
+    """
+    AsyncGroq client with a pooled HTTP connection set, one per event loop.
+    Returns None when GROQ_API_KEY is missing.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        return None
+
+    def load():
+        import httpx
+        from groq import AsyncGroq
+        limits = httpx.Limits(
+            max_connections=settings.ASYNC_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.ASYNC_MAX_CONCURRENCY,
+        )
+        return AsyncGroq(
+            api_key=api_key,
+            max_retries=0,
+            timeout=settings.ASYNC_LLM_TIMEOUT_SECONDS,
+            http_client=httpx.AsyncClient(limits=limits, timeout=settings.ASYNC_LLM_TIMEOUT_SECONDS),
+        )
+    return _get_loop_local("async_groq_client", load)
+
+
+def get_request_semaphore():
+    """
+    Caps in-flight async requests per event loop at ASYNC_MAX_CONCURRENCY.
+    """
+    return _get_loop_local("request_semaphore", lambda: asyncio.Semaphore(settings.ASYNC_MAX_CONCURRENCY))
+
+
+def get_admission_controller():
+    """
+    Process-wide admission control (token bucket + concurrency cap) for LLM calls.
+    """
+    def load():
+        from backend.admission import AdmissionController
+        return AdmissionController(
+            rate_per_second=settings.LLM_RATE_PER_SECOND,
+            burst=settings.LLM_RATE_BURST,
+            max_concurrent=settings.LLM_MAX_CONCURRENT,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        )
+    return _get("admission", load)
+
+
+def get_answer_cache():
+    """
+    Returns None unless ANSWER_CACHE_ENABLED is set.
+    """
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+
+    def load():
+        from backend.answer_cache import AnswerCache
+        return AnswerCache(
+            settings.ANSWER_CACHE_PATH,
+            threshold=settings.ANSWER_CACHE_SIMILARITY,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+            ttl=settings.ANSWER_CACHE_TTL_SECONDS,
+        )
+    return _get("answer_cache", load)
+
+
+def warm_up(include_reranker=None):
+    """
+    Loads every resource up front (e.g. at app or worker startup) so the first
+    user request does not pay the cold-start cost. Returns the load times.
+    """
+    if include_reranker is None:
+        include_reranker = settings.RERANK_ENABLED
+
+    started = time.perf_counter()
+    get_llm()
+    refresh_snapshot()  # Loads the published index (collection, lexical/numpy indexes, verse store)
+    embedder = get_embedder()
+    if embedder is not None:
+        embedder.encode(["warm up"])  # First forward pass allocates kernels/buffers
+    if include_reranker:
+        cross_encoder = get_cross_encoder()
+        if cross_encoder is not None:
+            cross_encoder.predict([("warm up", "warm up")])  # Keeps the cold call out of the rerank cost estimate
+    get_answer_cache()
+    load_times["warm_up_total"] = time.perf_counter() - started
+    return dict(load_times)
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import secrets
+
+from backend.config import settings
+
+# Index builds are published as immutable snapshot directories:
+#
+#   data/index/snapshots/<snapshot id>/{chroma/, lexical_index.json, numpy_index/, verse_store.parquet, manifest.json}
+#   data/index/CURRENT   <- id of the snapshot readers should use
+#
+# A build writes into a private directory, renames it into place and only then
+# rewrites CURRENT (atomically), so readers never see a partial index.
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+_BUILDING_PREFIX = ".building-"
+
+
+class Snapshot:
+    """
+    Paths of one index build. Published snapshots are never modified.
+    """
+
+    def __init__(self, snapshot_id, path, chroma_path=None, lexical_index_path=None,
+                 numpy_index_dir=None, verse_store_path=None, manifest_path=None):
+        self.id = snapshot_id
+        self.path = path
+        self.chroma_path = chroma_path or os.path.join(path, "chroma")
+        self.lexical_index_path = lexical_index_path or os.path.join(path, "lexical_index.json")
+        self.numpy_index_dir = numpy_index_dir or os.path.join(path, "numpy_index")
+        self.verse_store_path = verse_store_path or os.path.join(path, "verse_store.parquet")
+        self.manifest_path = manifest_path or os.path.join(path, MANIFEST_FILE)
+
+    def __repr__(self):
+        return f"Snapshot({self.id!r})"
+
+    @classmethod
+    def legacy(cls):
+        """
+        The flat data/ layout written before snapshots existed; served until
+        the first snapshot is published.
+        """
+        return cls("legacy", settings.DATA_DIR,
+                   chroma_path=settings.CHROMA_PATH,
+                   lexical_index_path=settings.LEXICAL_INDEX_PATH,
+                   numpy_index_dir=settings.NUMPY_INDEX_DIR,
+                   verse_store_path=settings.VERSE_STORE_PATH,
+                   manifest_path=settings.INDEX_MANIFEST_PATH)
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+def snapshots_dir():
+    return os.path.join(settings.INDEX_ROOT, "snapshots")
+
+
+def _current_path():
+    return os.path.join(settings.INDEX_ROOT, CURRENT_FILE)
+
+
+def current_marker():
+    """
+    Cheap change detector for CURRENT (its stat), checked on every query.
+    """
+    try:
+        stat = os.stat(_current_path())
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+    except OSError:
+        return None
+
+
+def read_current():
+    """
+    The published snapshot, the legacy layout if nothing has been published
+    yet, or None when no index exists at all.
+    """
+    try:
+        with open(_current_path(), "r", encoding="utf-8") as f:
+            snapshot_id = f.read().strip()
+        path = os.path.join(snapshots_dir(), snapshot_id)
+        if snapshot_id and os.path.isdir(path):
+            return Snapshot(snapshot_id, path)
+    except OSError:
+        pass
+    if os.path.isdir(settings.CHROMA_PATH):
+        return Snapshot.legacy()
+    return None
+
+
+def corpus_hash(row_hashes):
+    """
+    Digest of the whole corpus from the per-verse content hashes.
+    """
+    digest = hashlib.sha256()
+    for verse_id in sorted(row_hashes):
+        digest.update(f"{verse_id}\x1f{row_hashes[verse_id]}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _timestamp():
+    # Microsecond UTC timestamp: ids sort by build time
+    now = time.time()
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f"{int(now * 1e6) % 1000000:06d}"
+
+
+def create_build_dir():
+    """
+    Private working directory for a new snapshot; invisible to readers.
+    """
+    while True:
+        path = os.path.join(snapshots_dir(), f"{_BUILDING_PREFIX}{_timestamp()}-{os.getpid()}-{secrets.token_hex(3)}")
+        try:
+            os.makedirs(path)
+            return Snapshot(os.path.basename(path), path)
+        except FileExistsError:
+            continue
+
+
+def finalize(build, manifest):
+    """
+    Writes the manifest and moves the build directory to its final, immutable
+    name (<UTC timestamp>-<corpus hash>). Returns the published-ready Snapshot.
+    """
+    # Two builds finishing in the same microsecond (e.g. concurrent syncs of
+    # one corpus) get a bumped suffix instead of colliding on the rename
+    for attempt in range(100):
+        snapshot_id = f"{_timestamp()}-{manifest['corpus_hash'][:8]}" + (f"-{attempt}" if attempt else "")
+        with open(build.manifest_path, "w", encoding="utf-8") as f:
+            json.dump({**manifest, "snapshot": snapshot_id, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+                      f, ensure_ascii=False, indent=1, sort_keys=True)
+
+        path = os.path.join(snapshots_dir(), snapshot_id)
+        if os.path.exists(path):
+            continue
+        try:
+            os.rename(build.path, path)
+        except OSError:
+            if os.path.exists(path):
+                continue  # Lost a race for the same id
+            raise
+        return Snapshot(snapshot_id, path)
+    raise FileExistsError(f"Could not find a free snapshot id for {build.path}")
+
+
+def publish(snapshot):
+    """
+    Points CURRENT at the snapshot (atomic rename); running backends pick it
+    up on their next query.
+    """
+    tmp_path = _current_path() + f".tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(snapshot.id + "\n")
+    os.replace(tmp_path, _current_path())
+
+
+def prune(keep=None, grace_seconds=None):
+    """
+    Deletes all but the newest `keep` snapshots (never the current one), and
+    build directories abandoned for more than a day. Older snapshots are kept
+    so processes still serving them can finish in-flight queries: a snapshot
+    is also kept until `grace_seconds` after the next one was built, however
+    many publishes happened since.
+    """
+    keep = settings.SNAPSHOT_KEEP if keep is None else keep
+    grace_seconds = settings.SNAPSHOT_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    current = read_current()
+    root = snapshots_dir()
+    if not os.path.isdir(root):
+        return []
+
+    removed = []
+    published = sorted(name for name in os.listdir(root) if not name.startswith("."))
+    for position, name in enumerate(published[:-keep] if keep > 0 else published):
+        if current is not None and name == current.id:
+            continue
+        # Until its successor was built it may have been CURRENT somewhere
+        successor = published[position + 1] if position + 1 < len(published) else None
+        superseded = os.path.getmtime(os.path.join(root, successor)) if successor else time.time()
+        if time.time() - superseded < grace_seconds:
+            continue
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        removed.append(name)
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if name.startswith(_BUILDING_PREFIX) and time.time() - os.path.getmtime(path) > 24 * 3600:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+    return removed
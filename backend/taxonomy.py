@@ -0,0 +1,44 @@
+import re
+import hashlib
+
+# Scriptures in the corpus, as stored in each verse's 'source' metadata.
+SCRIPTURE_SOURCES = ["Bhagavad Gita", "Yoga Sutras", "Upanishads", "Brahma Sutras"]
+
+# Topic descriptions for the frontend's focus areas. At index time each verse
+# is scored against these (cosine similarity of embeddings) and the scores are
+# stored as verse metadata, so retrieval can boost or filter by focus without
+# extra work per query. Changing them requires a re-index.
+FOCUS_TOPICS = {
+    "Relationships": (
+        "family, marriage, parents and children, friendship, love, compassion, "
+        "forgiveness, duty towards others, kinship and conflict with relatives"
+    ),
+    "Work/Career": (
+        "work, action and duty, karma yoga, leadership, skill in action, effort, "
+        "success and failure, acting without attachment to results, discipline at work"
+    ),
+    "Self-Growth": (
+        "meditation, self-control, mastering the mind, inner peace, discipline, "
+        "overcoming desire and anger, practice and detachment, knowledge of the Self"
+    ),
+}
+
+
+def focus_key(focus):
+    """
+    Metadata-safe key for a focus area, e.g. "Work/Career" -> "work_career".
+    """
+    return re.sub(r"[^a-z0-9]+", "_", focus.lower()).strip("_")
+
+
+def focus_score_field(focus):
+    return f"focus_{focus_key(focus)}"
+
+
+def focus_tag_field(focus):
+    return f"tag_{focus_key(focus)}"
+
+
+def focus_fingerprint():
+    payload = "\x1f".join(f"{name}={text}" for name, text in sorted(FOCUS_TOPICS.items()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from backend.config import settings
+
+logger = logging.getLogger("saarthi")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Latency buckets (seconds) shared by every stage histogram
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metrics:
+    """
+    Minimal thread-safe counters and histograms rendered in the Prometheus
+    text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._gauge_callbacks = []
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            data = self._histograms.setdefault(key, [0] * len(_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(_BUCKETS):
+                if seconds <= bound:
+                    data[i] += 1
+            data[-2] += seconds
+            data[-1] += 1
+
+    def register_gauges(self, callback):
+        """
+        callback() -> iterable of (name, value, labels dict), sampled at render time.
+        """
+        self._gauge_callbacks.append(callback)
+
+    def render(self):
+        def fmt_labels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        for (name, labels), value in sorted(counters.items()):
+            lines.append(f"{name}{fmt_labels(labels)} {value}")
+        for (name, labels), data in sorted(histograms.items()):
+            for bound, count in zip(_BUCKETS, data):
+                lines.append(f"{name}_bucket{fmt_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{fmt_labels(labels, [('le', '+Inf')])} {data[-1]}")
+            lines.append(f"{name}_sum{fmt_labels(labels)} {data[-2]:.6f}")
+            lines.append(f"{name}_count{fmt_labels(labels)} {data[-1]}")
+        for callback in self._gauge_callbacks:
+            try:
+                for name, value, labels in callback():
+                    lines.append(f"{name}{fmt_labels(sorted(labels.items()))} {value}")
+            except Exception as e:
+                logger.warning(json.dumps({"event": "gauge_error", "error": str(e)}))
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """
+    Per-request record of stage timings, token usage, cache outcomes and errors.
+    """
+
+    def __init__(self, name, **attributes):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attributes = attributes
+        self.stages = {}
+        self.tokens = {}
+        self.cache = {}
+        self.errors = []
+        self.started = time.perf_counter()
+        self.total_ms = None
+
+    def as_dict(self):
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            **self.attributes,
+            "total_ms": self.total_ms,
+            "stages_ms": {k: round(v, 2) for k, v in self.stages.items()},
+            "tokens": self.tokens,
+            "cache": self.cache,
+            "errors": self.errors,
+        }
+
+
+_current_trace = contextvars.ContextVar("saarthi_current_trace", default=None)
+_last_trace = contextvars.ContextVar("saarthi_last_trace", default=None)
+_metrics_written = 0.0
+
+
+@contextmanager
+def trace(name, **attributes):
+    """
+    Opens a request trace. Nested calls reuse the outer trace.
+    """
+    if _current_trace.get() is not None:
+        yield _current_trace.get()
+        return
+
+    current = Trace(name, **attributes)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator closed from another context (e.g. on garbage collection)
+            _current_trace.set(None)
+        current.total_ms = round((time.perf_counter() - current.started) * 1000, 2)
+        metrics.observe("saarthi_request_seconds", current.total_ms / 1000, request=name)
+        metrics.inc("saarthi_requests_total", request=name)
+        _last_trace.set(current)
+        if settings.TELEMETRY_LOG_TRACES:
+            logger.info(json.dumps({"event": "trace", **current.as_dict()}, ensure_ascii=False, default=str))
+        _maybe_write_metrics()
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a pipeline stage into the current trace and the stage histogram.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def record_stage(name, seconds):
+    metrics.observe("saarthi_stage_seconds", seconds, stage=name)
+    current = _current_trace.get()
+    if current is not None:
+        current.stages[name] = current.stages.get(name, 0.0) + seconds * 1000
+
+
+def record_cache(cache_name, hit):
+    metrics.inc("saarthi_cache_lookups_total", cache=cache_name, result="hit" if hit else "miss")
+    current = _current_trace.get()
+    if current is not None:
+        current.cache[cache_name] = "hit" if hit else "miss"
+
+
+def record_tokens(usage):
+    """
+    Records token counts from an LLM response's usage object (or dict).
+    """
+    if usage is None:
+        return
+    current = _current_trace.get()
+    for kind in ("prompt_tokens", "completion_tokens", "total_tokens"):
+        value = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if value is None:
+            continue
+        metrics.inc("saarthi_llm_tokens_total", value, kind=kind.replace("_tokens", ""))
+        if current is not None:
+            current.tokens[kind] = value
+
+
+def record_error(stage_name, error):
+    metrics.inc("saarthi_errors_total", stage=stage_name)
+    current = _current_trace.get()
+    if current is not None:
+        current.errors.append({"stage": stage_name, "error": str(error)})
+    logger.warning(json.dumps({
+        "event": "error",
+        "trace_id": current.id if current else None,
+        "stage": stage_name,
+        "error": str(error),
+    }, ensure_ascii=False))
+
+
+def last_trace():
+    """
+    The most recently finished trace in this thread/context, as a dict.
+    """
+    current = _last_trace.get()
+    return current.as_dict() if current else None
+
+
+def render_prometheus():
+    return metrics.render()
+
+
+def _maybe_write_metrics():
+    global _metrics_written
+    if not settings.METRICS_FILE:
+        return
+    now = time.monotonic()
+    if now - _metrics_written < settings.METRICS_FILE_INTERVAL_SECONDS:
+        return
+    _metrics_written = now
+    try:
+        # Private temp name: API workers and threads write the same METRICS_FILE
+        tmp_path = f"{settings.METRICS_FILE}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(render_prometheus())
+        os.replace(tmp_path, settings.METRICS_FILE)
+    except OSError as e:
+        logger.warning(json.dumps({"event": "metrics_write_error", "error": str(e)}))
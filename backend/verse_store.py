@@ -0,0 +1,109 @@
+import os
+import random
+import hashlib
+import datetime
+
+STORE_VERSION = 1
+_COLUMNS = ("id", "source", "chapter", "verse", "sanskrit", "translation")
+
+
+def reference(source, chapter, verse):
+    """
+    Display reference for a verse, e.g. "Bhagavad Gita 2.47".
+    """
+    return f"{source or 'Scripture'} {chapter if chapter is not None else '?'}.{verse if verse is not None else '?'}"
+
+
+def _key(source, chapter, verse):
+    return str(source), str(chapter).strip().lower(), str(verse).strip()
+
+
+class VerseStore:
+    """
+    Every verse of every scripture in one columnar (Parquet) file, written at
+    ingest time. Gives O(1) lookup by id or (source, chapter, verse), a
+    deterministic verse of the day and random sampling without touching the
+    source CSVs.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._by_id = {verse_id: i for i, verse_id in enumerate(columns["id"])}
+        self._by_ref = {
+            _key(s, c, v): i for i, (s, c, v) in enumerate(zip(columns["source"], columns["chapter"], columns["verse"]))
+        }
+        self._by_source = {}
+        for i, source in enumerate(columns["source"]):
+            self._by_source.setdefault(source, []).append(i)
+
+    def __len__(self):
+        return len(self.columns["id"])
+
+    @classmethod
+    def build(cls, rows):
+        """
+        rows: iterable of (verse_id, {"translation", "metadata"}) as produced by
+        the indexer's corpus reader.
+        """
+        columns = {name: [] for name in _COLUMNS}
+        for verse_id, row in rows:
+            meta = row["metadata"]
+            columns["id"].append(verse_id)
+            columns["source"].append(str(meta.get("source", "")))
+            # Upanishad chapters are names and their verses dotted paths, so both stay strings
+            columns["chapter"].append(str(meta.get("chapter", "")))
+            columns["verse"].append(str(meta.get("verse", "")))
+            columns["sanskrit"].append(str(meta.get("sanskrit", "")))
+            columns["translation"].append(str(row["translation"]))
+        return cls(columns)
+
+    def save(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table({name: pa.array(self.columns[name], type=pa.string()) for name in _COLUMNS})
+        table = table.replace_schema_metadata({"version": str(STORE_VERSION)})
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, memory_map=True)
+        version = (table.schema.metadata or {}).get(b"version", b"").decode()
+        if version != str(STORE_VERSION):
+            raise ValueError(f"Unsupported verse store version {version or None}")
+        return cls(table.to_pydict())
+
+    def row(self, i):
+        verse = {name: self.columns[name][i] for name in _COLUMNS}
+        verse["ref"] = reference(verse["source"], verse["chapter"], verse["verse"])
+        return verse
+
+    def get(self, verse_id):
+        i = self._by_id.get(verse_id)
+        return None if i is None else self.row(i)
+
+    def lookup(self, source, chapter, verse):
+        i = self._by_ref.get(_key(source, chapter, verse))
+        return None if i is None else self.row(i)
+
+    def verse_of_the_day(self, date=None, source=None):
+        """
+        The same verse for everyone on a given date (default: today), optionally
+        from one scripture.
+        """
+        rows = self._by_source.get(source, []) if source else range(len(self))
+        if not rows:
+            return None
+        date = date or datetime.date.today()
+        digest = hashlib.sha256(f"{date.isoformat()}|{source or ''}".encode("utf-8")).digest()
+        return self.row(rows[int.from_bytes(digest[:8], "big") % len(rows)])
+
+    def sample(self, n=1, source=None, rng=None):
+        rows = self._by_source.get(source, []) if source else range(len(self))
+        picks = (rng or random).sample(rows, min(n, len(rows)))
+        return [self.row(i) for i in picks]
@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+# Fix path to import backend settings
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from backend.config import settings
+from backend.embeddings import load_embedder
+from backend.resources import get_collection, get_vector_index, refresh_snapshot
+
+QUERIES_FILE = os.path.join(current_dir, "queries.json")
+
+
+def summarize(latencies_ms):
+    values = np.asarray(latencies_ms)
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(values.mean()),
+    }
+
+
+def top_k_ids(embeddings, k):
+    """
+    Top-k verse ids per query from the served index (built with the FP32 model).
+    """
+    index = get_vector_index()
+    if index is not None:
+        return [[index.ids[row] for row, _ in hits] for hits in index.search(embeddings, k)]
+    collection = get_collection()
+    if collection is None:
+        sys.exit("❌ No index found; run scripts/vector_engine.py first.")
+    return collection.query(query_embeddings=embeddings.tolist(), n_results=k)["ids"]
+
+
+def measure(backend, texts, repeats):
+    started = time.perf_counter()
+    model = load_embedder(backend)
+    load_s = time.perf_counter() - started
+    model.encode(["warm up"])
+
+    latencies = []
+    for _ in range(repeats):
+        for text in texts:
+            started = time.perf_counter()
+            model.encode([text])
+            latencies.append((time.perf_counter() - started) * 1000)
+    embeddings = model.encode(texts, convert_to_numpy=True).astype(np.float32)
+    return {"load_s": load_s, "query_ms": summarize(latencies)}, embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and top-k agreement of the FP32 and int8 ONNX query encoders.")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-overlap", type=float, default=settings.EMBEDDING_MIN_OVERLAP)
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout.")
+    args = parser.parse_args()
+
+    # Loads the published index that both encoders are compared against
+    refresh_snapshot()
+
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    texts = queries["starter_prompts"] + [item["query"] for item in queries["labelled"]]
+
+    torch_report, torch_embeddings = measure("torch", texts, args.repeats)
+    onnx_report, onnx_embeddings = measure("onnx", texts, args.repeats)
+
+    overlaps = [
+        len(set(reference) & set(candidate)) / max(1, len(reference))
+        for reference, candidate in zip(top_k_ids(torch_embeddings, args.k), top_k_ids(onnx_embeddings, args.k))
+    ]
+    cosine = np.sum(torch_embeddings * onnx_embeddings, axis=1) / (
+        np.linalg.norm(torch_embeddings, axis=1) * np.linalg.norm(onnx_embeddings, axis=1)
+    )
+
+    report = {
+        "k": args.k,
+        "queries": len(texts),
+        "threads": settings.EMBEDDING_THREADS,
+        "qconfig": settings.EMBEDDING_ONNX_QCONFIG,
+        "torch": torch_report,
+        "onnx": onnx_report,
+        "topk_overlap": float(np.mean(overlaps)),
+        "topk_overlap_min": float(np.min(overlaps)),
+        "embedding_cosine_mean": float(cosine.mean()),
+    }
+    print(f"📊 torch p50={torch_report['query_ms']['p50']:.2f}ms load={torch_report['load_s']:.2f}s | "
+          f"onnx p50={onnx_report['query_ms']['p50']:.2f}ms load={onnx_report['load_s']:.2f}s | "
+          f"top-{args.k} overlap {report['topk_overlap']:.3f}")
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+    if report["topk_overlap"] < args.min_overlap:
+        sys.exit(f"❌ int8 top-{args.k} overlap {report['topk_overlap']:.3f} is below {args.min_overlap}; keep EMBEDDING_BACKEND=torch.")
+    print(f"✅ int8 encoder agrees with FP32 (>= {args.min_overlap}).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+# Fix path to import backend settings
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from backend.config import settings
+from backend import rag_engine
+from backend.resources import warm_up
+
+QUERIES_FILE = os.path.join(current_dir, "queries.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_mode(mode, labelled, k, repeats):
+    """
+    Retrieval latency (uncached, embedding included) and recall@k for one mode.
+    """
+    settings.RETRIEVAL_MODE = mode
+    latencies = []
+    hits = 0
+    for item in labelled:
+        for _ in range(repeats):
+            rag_engine.embedding_cache.clear()
+            started = time.perf_counter()
+            _, sources = rag_engine._retrieve_uncached(item["query"], k)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if any(ref in sources for ref in item["relevant"]):
+            hits += 1
+
+    return {
+        "mode": mode,
+        "queries": len(labelled),
+        f"recall@{k}": hits / len(labelled),
+        "latency_ms": {
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dense-only and hybrid retrieval.")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--rerank", action="store_true", help="Keep cross-encoder reranking on for both modes.")
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout.")
+    args = parser.parse_args()
+
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        labelled = json.load(f)["labelled"]
+
+    settings.RERANK_ENABLED = args.rerank
+    warm_up(include_reranker=args.rerank)
+
+    report = {
+        "k": args.k,
+        "rerank": args.rerank,
+        "results": [run_mode(mode, labelled, args.k, args.repeats) for mode in ("dense", "hybrid")],
+    }
+    for result in report["results"]:
+        print(f"📊 {result['mode']:>6}: recall@{args.k}={result[f'recall@{args.k}']:.2f} "
+              f"p50={result['latency_ms']['p50']:.1f}ms p95={result['latency_ms']['p95']:.1f}ms")
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
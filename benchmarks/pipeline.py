@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import platform
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+# Fix path to import backend settings
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+QUERIES_FILE = os.path.join(current_dir, "queries.json")
+
+# End-to-end benchmark of retrieve_verses() and generate_answer() against the
+# local Groq stand-in (benchmarks/stub_groq_server.py), so numbers reflect our
+# own pipeline rather than network or provider variance:
+#
+#   python benchmarks/pipeline.py --output runs/baseline.json
+#
+# Compare JSON reports across changes to the embedder, index or caches.
+
+
+def percentiles(values_ms):
+    if not values_ms:
+        return {}
+    ordered = sorted(values_ms)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean": statistics.mean(ordered),
+        "p50": pct(50),
+        "p95": pct(95),
+        "p99": pct(99),
+        "max": ordered[-1],
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def cold_start_probe():
+    """
+    Runs in a fresh interpreter: import, warm-up and first query timings.
+    """
+    started = time.perf_counter()
+    from backend import rag_engine
+    imported = time.perf_counter()
+    load_times = rag_engine.warm_up()
+    warmed = time.perf_counter()
+    rag_engine.retrieve_verses("How do I find inner peace?")
+    first_query = time.perf_counter()
+    print(json.dumps({
+        "import_s": imported - started,
+        "warm_up_s": warmed - imported,
+        "first_retrieval_ms": (first_query - warmed) * 1000,
+        "load_times_s": load_times,
+        "peak_rss_mb": peak_rss_mb(),
+    }, default=str))
+
+
+def measure_cold_start(env):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--cold-start-probe"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    # The probe's JSON is the last stdout line; anything before it is model-loading chatter
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_retrieval(rag_engine, queries, labelled, k, repeats):
+    uncached, cached = [], []
+    for _ in range(repeats):
+        for query in queries:
+            rag_engine.embedding_cache.clear()
+            rag_engine.retrieval_cache.clear()
+            started = time.perf_counter()
+            rag_engine.retrieve_verses(query, n_results=k)
+            uncached.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            rag_engine.retrieve_verses(query, n_results=k)
+            cached.append((time.perf_counter() - started) * 1000)
+
+    hits = 0
+    for item in labelled:
+        _, sources = rag_engine.retrieve_verses(item["query"], n_results=k)
+        if any(ref in sources for ref in item["relevant"]):
+            hits += 1
+
+    return {
+        "uncached_ms": percentiles(uncached),
+        "cached_ms": percentiles(cached),
+        f"recall@{k}": hits / len(labelled) if labelled else None,
+    }
+
+
+def bench_generation(rag_engine, telemetry, queries, repeats, concurrency):
+    latencies, stages, prompt_tokens = [], {}, []
+    for _ in range(repeats):
+        for query in queries:
+            rag_engine.embedding_cache.clear()
+            rag_engine.retrieval_cache.clear()
+            started = time.perf_counter()
+            rag_engine.generate_answer(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+            trace = telemetry.last_trace() or {}
+            for name, ms in trace.get("stages_ms", {}).items():
+                stages.setdefault(name, []).append(ms)
+            if trace.get("tokens", {}).get("prompt_tokens"):
+                prompt_tokens.append(trace["tokens"]["prompt_tokens"])
+
+    # Throughput: the same workload from `concurrency` threads at once
+    workload = [q for _ in range(repeats) for q in queries]
+    rag_engine.embedding_cache.clear()
+    rag_engine.retrieval_cache.clear()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(rag_engine.generate_answer, workload))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "sequential_ms": percentiles(latencies),
+        "stages_ms": {name: percentiles(values) for name, values in stages.items()},
+        "prompt_tokens": percentiles(prompt_tokens),
+        "throughput": {
+            "concurrency": concurrency,
+            "requests": len(workload),
+            "seconds": elapsed,
+            "requests_per_second": len(workload) / elapsed if elapsed else None,
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval and generation benchmark with a stubbed LLM.")
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Stub time to first token.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--skip-cold-start", action="store_true")
+    parser.add_argument("--skip-generation", action="store_true")
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout.")
+    parser.add_argument("--cold-start-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_probe:
+        cold_start_probe()
+        return
+
+    from stub_groq_server import start_server
+    server, base_url = start_server(latency_ms=args.llm_latency_ms, tokens_per_second=args.llm_tokens_per_second)
+    # Both the sync and async Groq clients read these when they are first created
+    os.environ["GROQ_BASE_URL"] = base_url
+    os.environ["GROQ_API_KEY"] = "stub"
+
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    starter = queries["starter_prompts"]
+    labelled = queries["labelled"]
+    all_queries = starter + [item["query"] for item in labelled]
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+    }
+    if not args.skip_cold_start:
+        print("⏱️ Measuring cold start in a fresh process...")
+        report["cold_start"] = measure_cold_start(dict(os.environ))
+
+    from backend.config import settings
+    from backend import rag_engine, telemetry
+
+    report["config"] = {
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "retrieval_backend": settings.RETRIEVAL_BACKEND,
+        "retrieval_mode": settings.RETRIEVAL_MODE,
+        "rerank_enabled": settings.RERANK_ENABLED,
+        "answer_cache_enabled": settings.ANSWER_CACHE_ENABLED,
+        "query_cache_size": settings.QUERY_CACHE_SIZE,
+        "k": args.k,
+        "repeats": args.repeats,
+        "queries": len(all_queries),
+        "stub_llm_latency_ms": args.llm_latency_ms,
+    }
+
+    rag_engine.warm_up()
+    report["memory_after_warm_up_mb"] = peak_rss_mb()
+
+    print("🔎 Benchmarking retrieval...")
+    report["retrieval"] = bench_retrieval(rag_engine, all_queries, labelled, args.k, args.repeats)
+    if not args.skip_generation:
+        print("💬 Benchmarking generation against the stub LLM...")
+        report["generation"] = bench_generation(rag_engine, telemetry, all_queries, args.repeats, args.concurrency)
+    report["peak_rss_mb"] = peak_rss_mb()
+    server.shutdown()
+
+    retrieval = report["retrieval"]
+    print(f"📊 retrieval p50={retrieval['uncached_ms']['p50']:.1f}ms p99={retrieval['uncached_ms']['p99']:.1f}ms "
+          f"(cached p50={retrieval['cached_ms']['p50']:.3f}ms) recall@{args.k}={retrieval[f'recall@{args.k}']:.2f}")
+    if "generation" in report:
+        generation = report["generation"]
+        print(f"📊 generation p50={generation['sequential_ms']['p50']:.1f}ms p99={generation['sequential_ms']['p99']:.1f}ms "
+              f"throughput={generation['throughput']['requests_per_second']:.2f} req/s @ {args.concurrency}")
+
+    output = json.dumps(report, indent=2, default=str)
+    print(output)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for Groq's OpenAI-compatible chat completions endpoint, so
+# generation can be benchmarked offline with a fixed, known LLM latency:
+#
+#   python benchmarks/stub_groq_server.py --port 8766 --latency-ms 300
+#   GROQ_BASE_URL=http://127.0.0.1:8766 GROQ_API_KEY=stub python benchmarks/pipeline.py
+#
+# The Groq SDK picks up GROQ_BASE_URL on its own; no backend change is needed.
+
+_PATH = "/openai/v1/chat/completions"
+_WORD = "dharma "
+
+
+def make_handler(latency_ms, tokens_per_second, answer_tokens):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if self.path.rstrip("/") != _PATH:
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+            usage = {
+                "prompt_tokens": max(1, prompt_chars // 4),
+                "completion_tokens": answer_tokens,
+                "total_tokens": max(1, prompt_chars // 4) + answer_tokens,
+            }
+            base = {
+                "id": f"stub-{time.time_ns()}",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+            }
+
+            time.sleep(latency_ms / 1000)
+            if request.get("stream"):
+                self._stream(base, usage)
+            else:
+                time.sleep(answer_tokens / tokens_per_second)
+                self._send_json({
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": _WORD * answer_tokens},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+        def _send_json(self, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, base, usage):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def send(payload):
+                self.wfile.write(f"data: {payload}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            for i in range(answer_tokens):
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": _WORD}, "finish_reason": None}]}
+                send(json.dumps(chunk))
+                time.sleep(1 / tokens_per_second)
+            final = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                     "x_groq": {"id": base["id"], "usage": usage}}
+            send(json.dumps(final))
+            send("[DONE]")
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=0, latency_ms=300.0, tokens_per_second=250.0, answer_tokens=120):
+    """
+    Starts the stub in a daemon thread. Returns (server, base_url); port=0 picks a free port.
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms, tokens_per_second, answer_tokens))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned chat completions in the Groq API format.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Delay before the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--answer-tokens", type=int, default=120)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        (args.host, args.port), make_handler(args.latency_ms, args.tokens_per_second, args.answer_tokens)
+    )
+    print(f"🧪 Stub Groq API on http://{args.host}:{args.port}{_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+# Fix path to import backend settings
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from backend.resources import active_snapshot, get_collection, get_embedder, get_vector_index, refresh_snapshot
+
+QUERIES_FILE = os.path.join(current_dir, "queries.json")
+
+
+def summarize(latencies_ms):
+    values = np.asarray(latencies_ms)
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(values.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query latency of the Chroma and numpy vector backends.")
+    parser.add_argument("-k", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="Write the JSON report here as well as stdout.")
+    args = parser.parse_args()
+
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    texts = queries["starter_prompts"] + [item["query"] for item in queries["labelled"]]
+
+    refresh_snapshot()  # Loads the published index
+
+    # Embeddings are computed once so only the vector search is timed
+    embeddings = get_embedder().encode(texts, convert_to_numpy=True).astype(np.float32)
+    collection = get_collection()
+    index = get_vector_index()
+    if index is None:
+        snapshot = active_snapshot()
+        sys.exit(f"❌ No numpy index in snapshot {snapshot.id if snapshot else None}; run scripts/vector_engine.py first.")
+
+    chroma_ms, numpy_ms, overlaps = [], [], []
+    for _ in range(args.repeats):
+        for vector in embeddings:
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[vector.tolist()], n_results=args.k)
+            chroma_ms.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            hits = index.search(vector, args.k)[0]
+            numpy_ms.append((time.perf_counter() - started) * 1000)
+
+            chroma_ids = set(result["ids"][0])
+            overlaps.append(len(chroma_ids & {index.ids[row] for row, _ in hits}) / max(1, len(chroma_ids)))
+
+    batch_ms = []
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        index.search(embeddings, args.k)
+        batch_ms.append((time.perf_counter() - started) * 1000)
+
+    report = {
+        "k": args.k,
+        "queries": len(texts),
+        "corpus_size": len(index),
+        "chroma_ms": summarize(chroma_ms),
+        "numpy_ms": summarize(numpy_ms),
+        "numpy_batch_ms": {**summarize(batch_ms), "batch_size": len(texts)},
+        "topk_overlap": float(np.mean(overlaps)),
+    }
+    print(f"📊 chroma p50={report['chroma_ms']['p50']:.3f}ms p99={report['chroma_ms']['p99']:.3f}ms | "
+          f"numpy p50={report['numpy_ms']['p50']:.3f}ms p99={report['numpy_ms']['p99']:.3f}ms | "
+          f"top-{args.k} overlap {report['topk_overlap']:.3f}")
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import json
+import contextvars
+
+import requests
+
+from backend.config import settings
+
+# Thin client for backend/api.py, used by the Streamlit app when API_URL is
+# set. Mirrors the in-process functions app.py uses, so the UI code is the
+# same either way, but loads no models or indexes itself.
+
+_session = requests.Session()
+_last_trace = contextvars.ContextVar("saarthi_api_last_trace", default=None)
+
+
+def _url(path):
+    return settings.API_URL.rstrip("/") + path
+
+
+def _answer_payload(user_query, chat_history, mode, language, focus, source_filter):
+    return {
+        "query": user_query,
+        "history": list(chat_history or []),
+        "mode": mode,
+        "language": language,
+        "focus": focus,
+        "source_filter": list(source_filter) if source_filter else None,
+    }
+
+
+def retrieve_verses(query, n_results=None, source_filter=None, focus=None):
+    response = _session.post(_url("/retrieve"), timeout=settings.API_TIMEOUT_SECONDS, json={
+        "query": query,
+        "n_results": n_results,
+        "source_filter": list(source_filter) if source_filter else None,
+        "focus": focus,
+    })
+    response.raise_for_status()
+    data = response.json()
+    return data["context"], data["sources"]
+
+
+def generate_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General", source_filter=None):
+    response = _session.post(_url("/answer"), timeout=settings.API_TIMEOUT_SECONDS,
+                             json=_answer_payload(user_query, chat_history, mode, language, focus, source_filter))
+    response.raise_for_status()
+    data = response.json()
+    _last_trace.set(data.get("trace"))
+    return data["answer"], data["sources"]
+
+
+def stream_answer(user_query, chat_history=[], mode="Beginner", language="English", focus="General", source_filter=None):
+    """
+    Same contract as rag_engine.stream_answer(): text chunks, then the list
+    of sources as the final item.
+    """
+    payload = _answer_payload(user_query, chat_history, mode, language, focus, source_filter)
+    try:
+        with _session.post(_url("/answer/stream"), json=payload, stream=True,
+                           timeout=settings.API_TIMEOUT_SECONDS) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "token" in event:
+                    yield event["token"]
+                elif "sources" in event:
+                    yield event["sources"]
+                elif "trace" in event:
+                    _last_trace.set(event["trace"])
+    except requests.RequestException as e:
+        yield f"Error connecting to Saarthi API: {e}"
+        yield []
+
+
+def last_trace():
+    return _last_trace.get()
+
+
+def cache_stats():
+    try:
+        response = _session.get(_url("/stats"), timeout=settings.API_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return []
+
+
+def verse_of_the_day(source=None):
+    try:
+        response = _session.get(_url("/verse-of-the-day"), params={"source": source} if source else None,
+                                timeout=settings.API_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+
+def warm_up():
+    """
+    Models live in the API workers; just checks that the service is reachable.
+    """
+    try:
+        return _session.get(_url("/ready"), timeout=settings.API_TIMEOUT_SECONDS).json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"⚠️  Saarthi API not ready at {settings.API_URL}: {e}")
+        return None
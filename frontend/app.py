@@ -1,12 +1,9 @@
 import streamlit as st
 import sys
 import os
-import pandas as pd
-import random
-import textwrap
 import time
-from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
+import datetime
+import itertools
 
 # --- 1. PATH SETUP ---
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -14,38 +11,53 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 # --- CLOUD DEPLOYMENT SETUP (CRITICAL) ---
-# This ensures the database is built when deployed to Streamlit Cloud
-chroma_db_path = os.path.join(project_root, 'data', 'chroma_db')
-
-if not os.path.exists(chroma_db_path):
-    st.warning("⚙️ First-time setup: Building the Knowledge Base... (This takes ~1 minute)")
-    
-    # Add scripts folder to path to import vector engine
-    scripts_path = os.path.join(project_root, 'scripts')
-    sys.path.append(scripts_path)
-    
-    try:
-        # Run the builder script
-        from scripts.vector_engine import build_vector_db
-        build_vector_db()
-        st.success("✅ Knowledge Base Built! Refreshing...")
-        time.sleep(2)
-        st.rerun()
-    except Exception as e:
-        st.error(f"Setup Failed: {e}")
-        # Try to continue anyway, in case it's a false negative
-        pass
+# This ensures the database is built when deployed to Streamlit Cloud.
+# The build runs on a background thread and publishes an index snapshot;
+# the backend starts serving it on the next question, no restart needed.
+# With API_URL set the index lives with the API service instead.
+from backend.config import settings
+from backend import snapshots
+
+@st.cache_resource(show_spinner=False)
+def start_first_run_build():
+    import threading
+    from scripts.vector_engine import build_vector_db
+
+    def run():
+        try:
+            # Single process: no worker pool inside Streamlit
+            build_vector_db(workers=1)
+        except Exception as e:
+            print(f"❌ First-time index build failed: {e}")
+
+    builder = threading.Thread(target=run, daemon=True, name="saarthi-index-build")
+    builder.start()
+    return builder
+
+if not settings.API_URL and snapshots.read_current() is None:
+    if start_first_run_build().is_alive():
+        st.info("⚙️ First-time setup: Building the Knowledge Base in the background... (This takes ~1 minute)")
+    else:
+        st.error("Setup Failed: the Knowledge Base could not be built. Check the server logs.")
 
 # Import Backend
 try:
-    from backend.rag_engine import generate_answer
+    if settings.API_URL:
+        # Thin client: retrieval and generation run in the API service (backend/api.py)
+        from frontend.api_client import stream_answer, warm_up, cache_stats, last_trace, verse_of_the_day
+    else:
+        from backend.rag_engine import stream_answer, warm_up, cache_stats
+        from backend.telemetry import last_trace
+        from backend.resources import get_verse_store
+
+        def verse_of_the_day(source=None):
+            store = get_verse_store()
+            return store.verse_of_the_day(source=source) if store else None
+    from frontend.wisdom_cards import THEMES, render_card
+    from backend.taxonomy import SCRIPTURE_SOURCES
 except ImportError:
     st.error("⚠️ Backend not found. Please ensure you are in the project root.")
 
-# Define paths
-FONT_PATH = os.path.join(current_dir, 'font.ttf')
-DATA_PATH = os.path.join(project_root, 'data', 'gita_verses.csv')
-
 # --- 2. PAGE CONFIG ---
 st.set_page_config(
     page_title="Saarthi (सारथी) 2.0",
@@ -54,75 +66,21 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- 3. HELPER: THEMED WISDOM CARDS ---
-def create_quote_image(text, theme="Mystic Blue"):
-    img_width, img_height = 800, 800
-    
-    # Enhanced Theme Color Maps with richer palettes
-    themes = {
-        "Mystic Blue": ((15, 23, 42), (88, 28, 135)),           # Deep slate to purple
-        "Saffron Sunset": ((255, 107, 0), (220, 38, 38)),       # Vibrant orange to red
-        "Forest Peace": ((5, 46, 22), (34, 197, 94)),           # Dark to bright green
-        "Galaxy Void": ((0, 0, 0), (109, 40, 217)),             # Black to vivid purple
-        "Golden Temple": ((180, 83, 9), (234, 179, 8)),         # Bronze to gold
-        "Lotus Pink": ((157, 23, 77), (236, 72, 153))           # Deep to bright pink
-    }
-    
-    top_color, bottom_color = themes.get(theme, themes["Mystic Blue"])
-
-    img = Image.new('RGB', (img_width, img_height), top_color)
-    draw = ImageDraw.Draw(img)
-
-    # Smooth gradient
-    for y in range(img_height):
-        r = int(top_color[0] + (bottom_color[0] - top_color[0]) * y / img_height)
-        g = int(top_color[1] + (bottom_color[1] - top_color[1]) * y / img_height)
-        b = int(top_color[2] + (bottom_color[2] - top_color[2]) * y / img_height)
-        draw.line([(0, y), (img_width, y)], fill=(r, g, b))
-
-    # Add decorative elements
-    draw.ellipse([50, 50, 150, 150], outline=(255, 215, 0, 100), width=3)
-    draw.ellipse([650, 650, 750, 750], outline=(255, 215, 0, 100), width=3)
-
-    try:
-        font_large = ImageFont.truetype(FONT_PATH, 44)
-        font_small = ImageFont.truetype(FONT_PATH, 26)
-        font_header = ImageFont.truetype(FONT_PATH, 36)
-    except:
-        font_large = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-        font_header = ImageFont.load_default()
-
-    clean_text = text.replace("**", "").replace("###", "").replace(":", "")
-    if len(clean_text) > 280: clean_text = clean_text[:280] + "..."
-    wrapper = textwrap.TextWrapper(width=28) 
-    word_list = wrapper.wrap(text=clean_text)
-
-    margin = 80
-    current_h = 140
-    draw.text((margin, 60), "🕉️ SAARTHI WISDOM", fill=(255, 215, 0), font=font_header)
-
-    for line in word_list:
-        draw.text((margin, current_h), line, font=font_large, fill=(255, 255, 255))
-        bbox = font_large.getbbox(line)
-        line_height = bbox[3] if bbox else 20
-        current_h += line_height + 18 
-
-    draw.text((margin, img_height - 90), "✨ Generated by Saarthi AI", fill=(220, 220, 220), font=font_small)
-
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return buf.getvalue()
+# Load models and clients once per server process; every session shares them.
+@st.cache_resource(show_spinner="🕉️ Awakening Saarthi...")
+def warm_backend():
+    return warm_up()
 
+warm_backend()
+
+# --- 3. HELPER: DAILY SHLOKA ---
+# Cached per day: every rerun would otherwise refetch it (an HTTP call with API_URL set)
 @st.cache_data(ttl=3600)
-def get_random_shloka():
-    if not os.path.exists(DATA_PATH): return None
-    try:
-        df = pd.read_csv(DATA_PATH)
-        if df.empty: return None
-        row = df.sample(1).iloc[0]
-        return {"text": str(row['sanskrit']).strip(), "meaning": str(row['translation']), "ref": f"Gita {row['chapter']}.{row['verse']}"}
-    except: return None
+def get_daily_shloka(day):
+    # Same Gita verse for every visitor on a given day, from the ingest-time verse store
+    verse = verse_of_the_day(source="Bhagavad Gita")
+    if not verse: return None
+    return {"text": verse["sanskrit"].strip(), "meaning": verse["translation"], "ref": verse["ref"]}
 
 # --- 4. ENHANCED CSS STYLING ---
 st.markdown("""
@@ -211,12 +169,14 @@ with st.sidebar:
     st.markdown("### ⚙️ Preferences")
     language = st.radio("🌐 Language:", ["English", "Hindi"])
     mode = st.radio("📖 Depth Level:", ["Beginner", "Scholar"])
+    debug_panel = st.toggle("🛠️ Debug panel", value=False, help="Show per-stage latency and cache stats for the last answer")
     st.divider()
     st.markdown("### 🎯 Focus Area")
     focus_options = {"General": "🌟", "Relationships": "💞", "Work/Career": "💼", "Self-Growth": "🌱"}
     focus = st.selectbox("I am exploring:", list(focus_options.keys()), format_func=lambda x: f"{focus_options[x]} {x}")
+    scriptures = st.multiselect("📜 Draw from:", SCRIPTURE_SOURCES, default=SCRIPTURE_SOURCES, help="Limit answers to specific scriptures")
     st.divider()
-    daily = get_random_shloka()
+    daily = get_daily_shloka(datetime.date.today().isoformat())
     if daily:
         st.markdown("### ✨ Daily Wisdom")
         st.info(f"*{daily['text']}*\n\n— {daily['ref']}")
@@ -277,14 +237,27 @@ if prompt := st.chat_input("💭 Ask Saarthi anything..."):
 
 if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
     with st.chat_message("assistant", avatar="https://api.dicebear.com/7.x/bottts/svg?seed=saarthi&backgroundColor=b6e3f4"):
+        history = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
+        sources = []
+
+        def answer_tokens():
+            # stream_answer yields text chunks, then the list of sources last
+            for item in stream_answer(st.session_state.messages[-1]["content"], history[:-1], mode=mode, language=language, focus=focus,
+                                      source_filter=scriptures if len(scriptures) < len(SCRIPTURE_SOURCES) else None):
+                if isinstance(item, list):
+                    sources.extend(item)
+                else:
+                    yield item
+
+        tokens = answer_tokens()
         with st.spinner("🔮 Consulting the sacred texts..."):
-            history = [{"role": m["role"], "content": m["content"]} for m in st.session_state.messages]
-            answer, sources = generate_answer(st.session_state.messages[-1]["content"], history[:-1], mode=mode, language=language, focus=focus)
-            full_response = answer
-            if sources:
-                header = "\n\n---\n\n**📚 Sacred References:**\n"
-                full_response += header + "\n".join([f"• {s}" for s in sources])
-            st.markdown(full_response)
+            first_token = next(tokens, "")
+        full_response = st.write_stream(itertools.chain([first_token], tokens))
+        if sources:
+            references = "\n\n---\n\n**📚 Sacred References:**\n" + "\n".join([f"• {s}" for s in sources])
+            st.markdown(references)
+            full_response += references
+    st.session_state.last_trace = last_trace()
     st.session_state.messages.append({"role": "assistant", "content": full_response})
     st.rerun()
 
@@ -296,14 +269,30 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "assis
     st.write("")
     c_theme, c_btn = st.columns([3, 2])
     with c_theme:
-        theme_choice = st.selectbox("🎨 Choose Your Theme:", ["Mystic Blue", "Saffron Sunset", "Forest Peace", "Galaxy Void", "Golden Temple", "Lotus Pink"], help="Select a color palette for your wisdom card")
+        theme_choice = st.selectbox("🎨 Choose Your Theme:", list(THEMES), help="Select a color palette for your wisdom card")
+    # Cards are rendered only on request; render_card caches them by (text, theme)
+    card_request = (len(st.session_state.messages), theme_choice)
+    card_bytes = render_card(last_response, theme=theme_choice) if st.session_state.get("card_request") == card_request else None
     with c_btn:
         st.write("")
-        card_text = last_response.split("**📚 Sacred References:**")[0].strip()
-        card_text = card_text.split("**📚 Reference:**")[0].strip()
-        card_bytes = create_quote_image(card_text, theme=theme_choice)
-        st.download_button(label="📥 Download Card", data=card_bytes, file_name=f"saarthi_wisdom_{theme_choice.lower().replace(' ', '_')}.png", mime="image/png", use_container_width=True)
-    with st.expander("👁️ Preview Card"):
-        st.image(card_bytes, use_container_width=True)
+        if card_bytes is None:
+            if st.button("✨ Create Card", use_container_width=True):
+                st.session_state.card_request = card_request
+                st.rerun()
+        else:
+            st.download_button(label="📥 Download Card", data=card_bytes, file_name=f"saarthi_wisdom_{theme_choice.lower().replace(' ', '_')}.png", mime="image/png", use_container_width=True)
+    if card_bytes is not None:
+        with st.expander("👁️ Preview Card"):
+            st.image(card_bytes, use_container_width=True)
+
+# --- 10. DEBUG PANEL ---
+if debug_panel and st.session_state.get("last_trace"):
+    trace = st.session_state.last_trace
+    with st.expander(f"🛠️ Last answer: {trace['total_ms']:.0f} ms total", expanded=True):
+        st.bar_chart(trace["stages_ms"], horizontal=True)
+        st.caption(f"Tokens: {trace['tokens'] or 'n/a'} • Cache: {trace['cache'] or 'n/a'}")
+        if trace["errors"]:
+            st.error(trace["errors"])
+        st.dataframe(cache_stats(), hide_index=True, use_container_width=True)
 
 st.markdown("""<div style='text-align: center; padding: 40px 20px; margin-top: 60px; opacity: 0.6;'><div style='font-size: 2rem; margin-bottom: 10px;'>🕉️</div><p style='font-size: 0.9rem; color: #64748b;'>May you find wisdom, peace, and purpose on your journey</p></div>""", unsafe_allow_html=True)
\ No newline at end of file
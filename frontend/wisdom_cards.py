@@ -0,0 +1,176 @@
+import os
+import hashlib
+import textwrap
+import threading
+from io import BytesIO
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Themed "Wisdom Card" renderer shared by the Streamlit app and batch jobs.
+# Each theme's background (gradient + decorations + header) is built once as a
+# NumPy array; a card only draws its text on a copy. Rendered PNGs are kept in
+# a size-bounded cache keyed by a hash of (text, theme).
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'font.ttf')
+CARD_SIZE = (800, 800)
+MAX_CHARS = 280
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Enhanced Theme Color Maps with richer palettes
+THEMES = {
+    "Mystic Blue": ((15, 23, 42), (88, 28, 135)),           # Deep slate to purple
+    "Saffron Sunset": ((255, 107, 0), (220, 38, 38)),       # Vibrant orange to red
+    "Forest Peace": ((5, 46, 22), (34, 197, 94)),           # Dark to bright green
+    "Galaxy Void": ((0, 0, 0), (109, 40, 217)),             # Black to vivid purple
+    "Golden Temple": ((180, 83, 9), (234, 179, 8)),         # Bronze to gold
+    "Lotus Pink": ((157, 23, 77), (236, 72, 153))           # Deep to bright pink
+}
+DEFAULT_THEME = "Mystic Blue"
+
+
+@lru_cache(maxsize=None)
+def _fonts():
+    """
+    (large, small, header) fonts, loaded once per process.
+    """
+    try:
+        return (ImageFont.truetype(FONT_PATH, 44),
+                ImageFont.truetype(FONT_PATH, 26),
+                ImageFont.truetype(FONT_PATH, 36))
+    except OSError:
+        default = ImageFont.load_default()
+        return default, default, default
+
+
+def gradient(top_color, bottom_color, size=CARD_SIZE):
+    """
+    Vertical linear gradient as a (height, width, 3) uint8 array.
+    """
+    width, height = size
+    top = np.asarray(top_color, dtype=np.float64)
+    delta = np.asarray(bottom_color, dtype=np.float64) - top
+    rows = (top + delta * (np.arange(height)[:, None] / height)).astype(np.uint8)
+    return np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (height, width, 3)))
+
+
+@lru_cache(maxsize=None)
+def _background(theme):
+    """
+    Theme background with everything that does not depend on the text.
+    Callers must copy() before drawing on it.
+    """
+    top_color, bottom_color = THEMES.get(theme, THEMES[DEFAULT_THEME])
+    img = Image.fromarray(gradient(top_color, bottom_color), "RGB")
+    draw = ImageDraw.Draw(img)
+    font_header = _fonts()[2]
+
+    # Add decorative elements
+    draw.ellipse([50, 50, 150, 150], outline=(255, 215, 0, 100), width=3)
+    draw.ellipse([650, 650, 750, 750], outline=(255, 215, 0, 100), width=3)
+    draw.text((80, 60), "🕉️ SAARTHI WISDOM", fill=(255, 215, 0), font=font_header)
+    return img
+
+
+def clean_card_text(text):
+    """
+    Strips markdown and the references footer, and shortens to fit the card.
+    """
+    text = text.split("**📚 Sacred References:**")[0].split("**📚 Reference:**")[0].strip()
+    clean_text = text.replace("**", "").replace("###", "").replace(":", "")
+    if len(clean_text) > MAX_CHARS:
+        clean_text = clean_text[:MAX_CHARS] + "..."
+    return clean_text
+
+
+def _render(clean_text, theme):
+    img = _background(theme).copy()
+    draw = ImageDraw.Draw(img)
+    font_large, font_small, _ = _fonts()
+
+    margin = 80
+    current_h = 140
+    for line in textwrap.TextWrapper(width=28).wrap(text=clean_text):
+        draw.text((margin, current_h), line, font=font_large, fill=(255, 255, 255))
+        bbox = font_large.getbbox(line)
+        line_height = bbox[3] if bbox else 20
+        current_h += line_height + 18
+
+    # Drawn last so it stays on top of a long quote
+    draw.text((margin, CARD_SIZE[1] - 90), "✨ Generated by Saarthi AI", fill=(220, 220, 220), font=font_small)
+
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class CardCache:
+    """
+    LRU cache of rendered PNGs, bounded by total bytes.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(clean_text, theme):
+        return hashlib.sha256(f"{theme}\x1f{clean_text}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            png = self._data.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return png
+
+    def set(self, key, png):
+        with self._lock:
+            if key in self._data:
+                return
+            self._data[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes and len(self._data) > 1:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"name": "wisdom_cards", "size": len(self._data), "bytes": self._bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+card_cache = CardCache()
+
+
+def render_card(text, theme=DEFAULT_THEME):
+    """
+    PNG bytes of a Wisdom Card for the given answer text, from cache when possible.
+    """
+    clean_text = clean_card_text(text)
+    key = CardCache.key(clean_text, theme)
+    png = card_cache.get(key)
+    if png is None:
+        png = _render(clean_text, theme)
+        card_cache.set(key, png)
+    return png
+
+
+def render_cards(texts, theme=DEFAULT_THEME, workers=4):
+    """
+    Renders many cards (e.g. one per verse) in parallel; PIL releases the GIL
+    while drawing and encoding. Returns PNG bytes in input order.
+    """
+    _background(theme)  # Build the shared background once, before the threads race for it
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(lambda text: render_card(text, theme), texts))
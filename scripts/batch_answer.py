@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+import argparse
+
+# Fix path to import backend settings
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+sys.path.append(project_root)
+
+from backend.config import settings
+from backend.batch import run_batch
+from backend.llm import LLMUnavailable
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help="JSONL with one {\"question\": ..., \"mode\"/\"language\"/\"focus\"/\"id\"} per line.")
+    parser.add_argument("-o", "--output", help="Results JSONL (default: <input>.answers.jsonl).")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY,
+                        help="Questions in flight at once.")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Questions started per second (default: LLM_RATE_PER_SECOND, 0 = unlimited).")
+    parser.add_argument("--window", type=int, default=settings.BATCH_WINDOW,
+                        help="Questions embedded per encoder call.")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming it.")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    print(f"📚 Answering {args.input} -> {output}")
+    try:
+        summary = run_batch(args.input, output, concurrency=args.concurrency, rate_per_second=args.rate,
+                            window=args.window, resume=not args.no_resume)
+    except LLMUnavailable as e:
+        sys.exit(f"❌ {e}")
+    print(f"\n✅ Batch complete: {json.dumps(summary)}")
+    if summary["failed"]:
+        print("⚠️  Some questions failed; run the same command again to retry them.")
+        sys.exit(1)
@@ -0,0 +1,68 @@
+import argparse
+import csv
+import json
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Offline stand-in for vedicscriptures.github.io, serving verses from the local
+# CSV in the same JSON shape, so scraper.py can be exercised without network:
+#
+#   python scripts/gita_standin_server.py --port 8765
+#   python scripts/scraper.py --base-url "http://127.0.0.1:8765/slok/{chapter}/{verse}/" --cache-dir /tmp/gita_cache --output /tmp/gita.csv
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+DEFAULT_CSV = os.path.join(project_root, "data", "gita_verses.csv")
+
+_PATH = re.compile(r"^/slok/(\d+)/(\d+)/?$")
+
+
+def load_verses(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {
+            (int(row["chapter"]), int(row["verse"])): {
+                "chapter": int(row["chapter"]),
+                "verse": int(row["verse"]),
+                "slok": row["sanskrit"],
+                "siva": {"author": "Swami Sivananda", "et": row["translation"]},
+            }
+            for row in csv.DictReader(f)
+        }
+
+
+def make_handler(verses):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = _PATH.match(self.path)
+            verse = verses.get((int(match.group(1)), int(match.group(2)))) if match else None
+            if verse is None:
+                self.send_error(404)
+                return
+            body = json.dumps(verse, ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve local Gita verses in the vedicscriptures API format.")
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    verses = load_verses(args.csv)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(verses))
+    print(f"📡 Serving {len(verses)} verses on http://{args.host}:{args.port}/slok/<chapter>/<verse>/")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
+import argparse
+import threading
+import json
 import time
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Fix path to allow importing backend settings
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,53 +19,182 @@ from backend.config import settings
 
 API_URL = "https://vedicscriptures.github.io/slok/{chapter}/{verse}/"
 OUTPUT_FILE = os.path.join(settings.DATA_DIR, "gita_verses.csv")
+CACHE_DIR = os.path.join(settings.DATA_DIR, "raw", "gita")
 
-def fetch_verse(chapter, verse):
-    url = API_URL.format(chapter=chapter, verse=verse)
+# Entries per chapter served by the API: the verses plus the closing colophon
+# (719 total). Knowing the layout up front lets every request be scheduled at
+# once; afterwards each chapter is probed past its known end in case the
+# source grows.
+VERSES_PER_CHAPTER = [48, 73, 44, 43, 30, 48, 31, 29, 35, 43, 56, 21, 36, 28, 21, 25, 29, 79]
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all worker threads: at most `rate` requests per
+    second on average, with bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(concurrency, retries):
+    """
+    One pooled session for all workers. Transient failures (429/5xx, dropped
+    connections) are retried with exponential backoff; 404 is not.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_verse(chapter, verse, data):
+    return {
+        "chapter": chapter,
+        "verse": verse,
+        "sanskrit": data.get('slok', '').strip(),
+        "translation": data.get('siva', {}).get('et', '').strip(),
+        "source": "Bhagavad Gita"
+    }
+
+
+def fetch_raw(session, limiter, base_url, cache_dir, chapter, verse, refresh=False):
+    """
+    Returns the raw JSON for a verse, from the on-disk cache when present so
+    reruns only fetch what is missing. Returns None if the verse does not exist
+    or could not be fetched.
+    """
+    cache_path = os.path.join(cache_dir, f"{chapter}_{verse}.json")
+    if not refresh and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError:
+            pass  # Corrupt cache entry, fetch again
+
+    url = base_url.format(chapter=chapter, verse=verse)
+    limiter.acquire()
     try:
-        response = requests.get(url, timeout=5)
+        response = session.get(url, timeout=10)
         if response.status_code != 200:
             return None
         data = response.json()
-        return {
-            "chapter": chapter,
-            "verse": verse,
-            "sanskrit": data.get('slok', '').strip(),
-            "translation": data.get('siva', {}).get('et', '').strip(),
-            "source": "Bhagavad Gita"
-        }
     except Exception as e:
         print(f"⚠️ Error fetching {chapter}.{verse}: {e}")
         return None
 
-def main():
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return data
+
+
+def scrape(base_url=API_URL, cache_dir=CACHE_DIR, output_file=OUTPUT_FILE,
+           concurrency=8, rate=20.0, retries=4, refresh=False):
     print(f"🚀 Starting Gita Scraper...")
-    print(f"📂 Output Path: {OUTPUT_FILE}")
-    
+    print(f"📂 Output Path: {output_file}")
+    print(f"🗄️  Cache: {cache_dir} ({concurrency} workers, {rate:g} req/s)")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    session = make_session(concurrency, retries)
+    limiter = RateLimiter(rate)
+    started = time.perf_counter()
+
+    jobs = [(chapter, verse)
+            for chapter, count in enumerate(VERSES_PER_CHAPTER, start=1)
+            for verse in range(1, count + 1)]
+
     all_verses = []
-    
-    # Loop through all 18 chapters
-    for chapter in range(1, 19):
-        print(f"\n📘 Chapter {chapter} ", end="", flush=True)
-        verse = 1
-        while True:
-            data = fetch_verse(chapter, verse)
-            if not data:
-                break # End of chapter
-            
-            all_verses.append(data)
-            if verse % 5 == 0: print(".", end="", flush=True) # Progress dot
-            verse += 1
-            time.sleep(0.05) # Be polite to the API
-
-    # Save
+    missing = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def fetch_all(pairs):
+            futures = {
+                pool.submit(fetch_raw, session, limiter, base_url, cache_dir, chapter, verse, refresh): (chapter, verse)
+                for chapter, verse in pairs
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+        for done, ((chapter, verse), data) in enumerate(fetch_all(jobs), start=1):
+            if data:
+                all_verses.append(parse_verse(chapter, verse, data))
+            else:
+                missing.append(f"{chapter}.{verse}")
+            if done % 50 == 0: print(".", end="", flush=True) # Progress dot
+
+        # Probe past the known end of every chapter at once until each 404s
+        frontier = {chapter: count + 1 for chapter, count in enumerate(VERSES_PER_CHAPTER, start=1)}
+        while frontier:
+            for (chapter, verse), data in fetch_all(list(frontier.items())):
+                if data:
+                    all_verses.append(parse_verse(chapter, verse, data))
+                    frontier[chapter] += 1
+                else:
+                    del frontier[chapter]
+
+    elapsed = time.perf_counter() - started
+    if missing:
+        # A partial CSV would make the next index sync delete the missing verses
+        print(f"\n❌ {len(missing)} verses unavailable, {output_file} left unchanged (rerun to resume): "
+              f"{', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+        return False
+
+    # Save (temp file + rename, so readers never see a half-written CSV)
     if all_verses:
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        df = pd.DataFrame(all_verses)
-        df.to_csv(OUTPUT_FILE, index=False)
-        print(f"\n\n✅ COMPLETED! Saved {len(df)} verses.")
-    else:
-        print("\n❌ No data fetched.")
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        df = pd.DataFrame(all_verses).sort_values(["chapter", "verse"])
+        tmp_file = f"{output_file}.tmp-{os.getpid()}"
+        df.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, output_file)
+        print(f"\n\n✅ COMPLETED! Saved {len(df)} verses in {elapsed:.1f}s.")
+        return True
+    print("\n❌ No data fetched.")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape the Bhagavad Gita into data/gita_verses.csv.")
+    parser.add_argument("--base-url", default=API_URL,
+                        help="URL template with {chapter} and {verse}; point it at a local stand-in server to run offline.")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Where raw JSON responses are cached.")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Max requests per second (0 = unlimited).")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cache and fetch everything again.")
+    args = parser.parse_args()
+
+    if not scrape(base_url=args.base_url, cache_dir=args.cache_dir, output_file=args.output,
+                  concurrency=args.concurrency, rate=args.rate, retries=args.retries, refresh=args.refresh):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,9 +1,15 @@
 import pandas as pd
 import chromadb
-from chromadb.utils import embedding_functions
+from sentence_transformers import SentenceTransformer
 import os
 import sys
 import glob
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+from itertools import islice
 
 # Fix path to import backend settings
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,75 +17,421 @@ project_root = os.path.dirname(current_dir)
 sys.path.append(project_root)
 
 from backend.config import settings
+from backend import snapshots
+from backend.embeddings import export_quantized_model
+from backend.lexical_index import LexicalIndex
+from backend.numpy_index import NumpyVectorIndex
+from backend.verse_store import VerseStore
+from backend.fields import FIELDS, field_weights, verse_fields, field_vector_id, field_vector_ids
+from backend.taxonomy import FOCUS_TOPICS, focus_score_field, focus_tag_field, focus_fingerprint
 
-def build_vector_db():
-    print(f"🧠 Initializing ChromaDB at: {settings.CHROMA_PATH}")
-    
-    # 1. Setup Client
-    client = chromadb.PersistentClient(path=settings.CHROMA_PATH)
-    
-    # 2. Setup Embedding Function (Must match what is used in rag_engine.py!)
-    sentence_transformer_ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name=settings.EMBEDDING_MODEL
-    )
+MANIFEST_VERSION = 1
 
-    # 3. Reset Collection (Clean Start)
-    try:
-        client.delete_collection(name="vedic_wisdom")
-        print("🗑️  Deleted old collection.")
-    except Exception:
-        pass
-
-    collection = client.create_collection(
-        name="vedic_wisdom",
-        embedding_function=sentence_transformer_ef,
-        metadata={"description": "Vedic Wisdom Multi-Source"}
-    )
 
-    # 4. Find all CSVs in data folder
+def row_fingerprint(source, chapter, verse, sanskrit, translation, commentary=None):
+    """
+    Content hash of a verse. Any edit to the text or its reference changes it.
+    """
+    values = (source, chapter, verse, sanskrit, translation) + ((commentary,) if commentary else ())
+    payload = "\x1f".join(str(v) for v in values)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_corpus():
+    """
+    Streams index-ready rows from every CSV in the data folder.
+    Yields (verse_id, row) pairs, with ids like 'Bhagavad Gita_2_47'.
+    """
     csv_pattern = os.path.join(settings.DATA_DIR, "*.csv")
-    csv_files = glob.glob(csv_pattern)
-    
+    csv_files = sorted(glob.glob(csv_pattern))
+
     print(f"📂 Found {len(csv_files)} datasets: {[os.path.basename(f) for f in csv_files]}")
 
     for file_path in csv_files:
         file_name = os.path.basename(file_path)
-        print(f"⚡ Indexing {file_name}...")
-        
-        df = pd.read_csv(file_path)
-        
-        documents = []
-        metadatas = []
-        ids = []
-
-        for index, row in df.iterrows():
-            # Determine source name
-            if "source" in row:
-                source_text = row['source']
-            else:
-                source_text = "Yoga Sutras" if "sutras" in file_name else "Bhagavad Gita"
-
-            # Create the text to be embedded (Rich Context)
-            text_to_embed = f"{row['translation']} (Sanskrit: {row['sanskrit']})"
-            
-            documents.append(text_to_embed)
-            
-            metadatas.append({
-                "chapter": row['chapter'],
-                "verse": row['verse'],
-                "sanskrit": str(row['sanskrit']),
-                "source": source_text
-            })
-            
-            # Unique ID: Gita_1_1
-            ids.append(f"{source_text}_{row['chapter']}_{row['verse']}")
-
-        # Batch Insert (Chroma handles batching efficiently)
-        if documents:
-            collection.add(documents=documents, metadatas=metadatas, ids=ids)
-            print(f"   --> Added {len(documents)} verses.")
+
+        for df in pd.read_csv(file_path, chunksize=settings.INGEST_WRITE_BATCH):
+            for record in df.to_dict("records"):
+                # Determine source name
+                if "source" in record:
+                    source_text = record['source']
+                else:
+                    source_text = "Yoga Sutras" if "sutras" in file_name else "Bhagavad Gita"
+
+                # Unique ID: Gita_1_1
+                verse_id = f"{source_text}_{record['chapter']}_{record['verse']}"
+                commentary = record.get('commentary')
+                commentary = commentary if isinstance(commentary, str) and commentary.strip() else None
+
+                yield verse_id, {
+                    # Create the text to be embedded (Rich Context)
+                    "document": f"{record['translation']} (Sanskrit: {record['sanskrit']})",
+                    "translation": str(record['translation']),
+                    "metadata": {
+                        "chapter": record['chapter'],
+                        "verse": record['verse'],
+                        "sanskrit": str(record['sanskrit']),
+                        "source": source_text
+                    },
+                    # Per-field embedding inputs for INDEX_MODE="fields"
+                    "fields": verse_fields(record['translation'], record['sanskrit'], commentary),
+                    "hash": row_fingerprint(source_text, record['chapter'], record['verse'],
+                                            record['sanskrit'], record['translation'], commentary),
+                }
+
+
+def _focus_signature():
+    # Focus scores and tags live in verse metadata, so changing the topics or
+    # the tag threshold needs a full re-index.
+    return f"{focus_fingerprint()}@{settings.FOCUS_TAG_THRESHOLD}"
+
+
+def _index_mode():
+    # Field vectors skip zero-weight fields, so the weights that switch a
+    # field on or off are part of the layout.
+    if settings.INDEX_MODE != "fields":
+        return "single"
+    return "fields:" + ",".join(field for field, weight in field_weights().items() if weight > 0)
+
+
+def load_manifest(snapshot):
+    if snapshot is None:
+        return None
+    manifest = snapshot.manifest()
+    if manifest is None and os.path.exists(snapshot.manifest_path):
+        print("⚠️  Could not read index manifest, ignoring it.")
+    return manifest
+
+
+def _vector_ids(verse_ids):
+    if _index_mode() == "single":
+        return list(verse_ids)
+    return [vector_id for verse_id in verse_ids for vector_id in field_vector_ids(verse_id)]
+
+
+def snapshot_manifest(hashes, vector_count):
+    return {
+        "version": MANIFEST_VERSION,
+        "collection": settings.COLLECTION_NAME,
+        "embedding_model": settings.EMBEDDING_MODEL,
+        "focus_topics": _focus_signature(),
+        "index_mode": _index_mode(),
+        "vector_count": vector_count,
+        "corpus_hash": snapshots.corpus_hash(hashes),
+        "row_count": len(hashes),
+        "rows": hashes,
+    }
+
+
+def write_lexical_index(path):
+    """
+    Rebuilds the BM25/reference index used by hybrid retrieval. It is cheap
+    (no embeddings), so it is always rebuilt from the full corpus.
+    """
+    started = time.perf_counter()
+    index = LexicalIndex.build(iter_corpus())
+    index.save(path)
+    print(f"🔤 Lexical index: {len(index.ids)} verses, {len(index.postings)} terms ({time.perf_counter() - started:.2f}s)")
+
+
+def write_verse_store(path):
+    """
+    Rebuilds the columnar verse store shared by the app (verse of the day)
+    and the backend (reference lookups).
+    """
+    started = time.perf_counter()
+    store = VerseStore.build(iter_corpus())
+    store.save(path)
+    print(f"📜 Verse store: {len(store)} verses ({time.perf_counter() - started:.2f}s)")
+
+
+def write_numpy_index(collection, directory):
+    """
+    Exports the collection's embeddings and metadata for the in-process
+    numpy retrieval backend.
+    """
+    started = time.perf_counter()
+    index = NumpyVectorIndex.from_collection(collection)
+    index.save(directory)
+    print(f"🧮 Numpy index: {len(index)} vectors ({time.perf_counter() - started:.2f}s)")
+
+
+def publish_snapshot(build, collection, hashes):
+    """
+    Writes the derived indexes next to the Chroma DB, seals the build
+    directory as an immutable snapshot and points CURRENT at it.
+    """
+    write_lexical_index(build.lexical_index_path)
+    write_verse_store(build.verse_store_path)
+    write_numpy_index(collection, build.numpy_index_dir)
+    snapshot = snapshots.finalize(build, snapshot_manifest(hashes, collection.count()))
+    snapshots.publish(snapshot)
+    print(f"📦 Published snapshot {snapshot.id}")
+    for name in snapshots.prune():
+        print(f"🧹 Removed old snapshot {name}")
+    return snapshot
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class EmbeddingPipeline:
+    """
+    Embeds streamed rows in fixed-size chunks and writes each chunk to Chroma
+    before pulling the next one, so memory stays bounded by the chunk size.
+    With more than one worker, encoding is spread over a sentence-transformers
+    multi-process pool (one CPU process per worker).
+
+    Each verse is also scored against the FOCUS_TOPICS vectors; the scores and
+    the derived focus tags are written into its metadata. With
+    INDEX_MODE="fields" every field of a verse gets its own vector (see
+    backend.fields), all carrying the verse's document and metadata.
+    """
+
+    def __init__(self, client, collection, workers=None, batch_size=None, write_batch=None):
+        self.client = client
+        self.collection = collection
+        self.batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self.index_mode = "fields" if settings.INDEX_MODE == "fields" else "single"
+        # Chunks are counted in verses; each may add one vector per field
+        vectors_per_verse = len(FIELDS) if self.index_mode == "fields" else 1
+        self.write_batch = min(write_batch or settings.INGEST_WRITE_BATCH, client.get_max_batch_size() // vectors_per_verse)
+
+        workers = settings.INGEST_WORKERS if workers is None else workers
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+
+        self.model = SentenceTransformer(settings.EMBEDDING_MODEL, device="cpu")
+        self.focus_names = list(FOCUS_TOPICS)
+        self.focus_vectors = self.model.encode(
+            [FOCUS_TOPICS[name] for name in self.focus_names], convert_to_numpy=True, normalize_embeddings=True
+        )
+        self.pool = None
+        self.written = 0
+        self.encode_seconds = 0.0
+
+    def __enter__(self):
+        if self.workers > 1:
+            self.pool = self.model.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            SentenceTransformer.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+    def vector_inputs(self, chunk):
+        """
+        (vector ids, embedding inputs, index of the owning row in chunk): one
+        vector per verse, or one per non-empty field in INDEX_MODE="fields".
+        """
+        if self.index_mode != "fields":
+            return [verse_id for verse_id, _ in chunk], [row["document"] for _, row in chunk], list(range(len(chunk)))
+        ids, texts, owners = [], [], []
+        for owner, (verse_id, row) in enumerate(chunk):
+            for field, text in row["fields"].items():
+                ids.append(field_vector_id(verse_id, field))
+                texts.append(text)
+                owners.append(owner)
+        return ids, texts, owners
+
+    def focus_metadata(self, embeddings, metadatas):
+        """
+        Copies of the metadata dicts with per-focus affinity scores and tags.
+        """
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        affinities = (embeddings / np.where(norms == 0, 1, norms)) @ self.focus_vectors.T
+        enriched = []
+        for meta, scores in zip(metadatas, affinities):
+            meta = dict(meta)
+            for name, score in zip(self.focus_names, scores):
+                meta[focus_score_field(name)] = round(float(score), 4)
+                meta[focus_tag_field(name)] = bool(score >= settings.FOCUS_TAG_THRESHOLD)
+            enriched.append(meta)
+        return enriched
+
+    def run(self, rows):
+        """
+        Consumes an iterable of (verse_id, row) pairs.
+        """
+        started = time.perf_counter()
+        for chunk in _chunked(rows, self.write_batch):
+            # Chroma rejects repeated ids within one write; the last row wins.
+            chunk = list(dict(chunk).items())
+            ids, texts, owners = self.vector_inputs(chunk)
+
+            encode_started = time.perf_counter()
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                pool=self.pool,
+                chunk_size=max(1, len(texts) // self.workers) if self.pool else None,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            self.encode_seconds += time.perf_counter() - encode_started
+
+            # Focus affinity is per verse: from its first vector (the document,
+            # or the translation field)
+            first = {}
+            for position, owner in enumerate(owners):
+                first.setdefault(owner, position)
+            verse_metadata = dict(zip(first, self.focus_metadata(
+                embeddings[list(first.values())], [chunk[owner][1]["metadata"] for owner in first]
+            )))
+
+            metadatas = []
+            for vector_id, owner in zip(ids, owners):
+                meta = verse_metadata[owner]
+                if self.index_mode == "fields":
+                    verse_id, row = chunk[owner]
+                    meta = {**meta, "verse_id": verse_id, "field": vector_id.rsplit("#", 1)[1],
+                            "fields": ",".join(row["fields"])}
+                metadatas.append(meta)
+
+            self.collection.upsert(
+                ids=ids,
+                embeddings=embeddings.tolist(),
+                documents=[chunk[owner][1]["document"] for owner in owners],
+                metadatas=metadatas,
+            )
+            self.written += len(chunk)
+            print(f"   --> Wrote {self.written} verses...")
+
+        elapsed = time.perf_counter() - started
+        if self.written:
+            print(
+                f"📈 Embedded {self.written} verses in {elapsed:.2f}s "
+                f"({self.written / elapsed:.1f} verses/sec, {self.workers} worker(s), "
+                f"encoder time {self.encode_seconds:.2f}s)"
+            )
+        return self.written
+
+
+def _get_collection(client):
+    # Embeddings are computed by EmbeddingPipeline (and by rag_engine at query
+    # time), so the collection itself never embeds text.
+    return client.get_or_create_collection(
+        name=settings.COLLECTION_NAME,
+        metadata={"description": "Vedic Wisdom Multi-Source"}
+    )
+
+
+def build_vector_db(workers=None):
+    """
+    Full build into a fresh snapshot. The live index is never touched, so
+    running apps keep serving it until the new snapshot is published.
+    """
+    build = snapshots.create_build_dir()
+    print(f"🧠 Building index snapshot in: {build.path}")
+
+    try:
+        client = chromadb.PersistentClient(path=build.chroma_path)
+        collection = _get_collection(client)
+
+        # Stream all CSVs in data folder through the embedding pipeline
+        hashes = {}
+
+        def rows():
+            for verse_id, row in iter_corpus():
+                if verse_id in hashes:
+                    print(f"⚠️  Duplicate verse id {verse_id}, keeping the last one.")
+                hashes[verse_id] = row["hash"]
+                yield verse_id, row
+
+        with EmbeddingPipeline(client, collection, workers=workers) as pipeline:
+            pipeline.run(rows())
+        publish_snapshot(build, collection, hashes)
+    except BaseException:
+        shutil.rmtree(build.path, ignore_errors=True)
+        raise
 
     print("\n✅ Database built successfully!")
 
+
+def sync_vector_db(workers=None):
+    """
+    Incremental re-index into a new snapshot: the current snapshot's Chroma DB
+    is copied, only new or edited verses are embedded into the copy, and
+    verses that disappeared from the CSVs are deleted from it. Falls back to
+    a full build when there is no usable manifest (first run, model change,
+    or a collection that no longer matches what the manifest recorded).
+    """
+    current = snapshots.read_current()
+    print(f"🔄 Syncing index snapshot: {current.id if current else 'none'}")
+
+    manifest = load_manifest(current)
+    if (
+        not manifest
+        or manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("collection") != settings.COLLECTION_NAME
+        or manifest.get("embedding_model") != settings.EMBEDDING_MODEL
+        or manifest.get("focus_topics") != _focus_signature()
+        or manifest.get("index_mode", "single") != _index_mode()
+    ):
+        print("📝 No compatible manifest found, doing a full rebuild.")
+        return build_vector_db(workers=workers)
+
+    # Pass 1: content hashes only, so an unchanged corpus costs no copy and no model load
+    indexed = manifest.get("rows", {})
+    hashes = {verse_id: row["hash"] for verse_id, row in iter_corpus()}
+    changed_ids = {verse_id for verse_id, digest in hashes.items() if indexed.get(verse_id) != digest}
+    removed = [verse_id for verse_id in indexed if verse_id not in hashes]
+    if not changed_ids and not removed:
+        print(f"\n✅ Index already up to date ({len(hashes)} verses).")
+        return
+
+    build = snapshots.create_build_dir()
+    try:
+        shutil.copytree(current.chroma_path, build.chroma_path)
+        client = chromadb.PersistentClient(path=build.chroma_path)
+        collection = _get_collection(client)
+        if collection.count() != manifest.get("vector_count", len(indexed)):
+            print("📝 Collection is out of step with the manifest, doing a full rebuild.")
+            shutil.rmtree(build.path, ignore_errors=True)
+            return build_vector_db(workers=workers)
+
+        if _index_mode() != "single" and changed_ids:
+            # An edited verse may have lost a field; drop all its vectors first
+            for batch in _chunked(_vector_ids(changed_ids), client.get_max_batch_size()):
+                collection.delete(ids=batch)
+
+        changed = 0
+        if changed_ids:
+            print("⚡ Upserting new or changed verses...")
+            with EmbeddingPipeline(client, collection, workers=workers) as pipeline:
+                changed = pipeline.run((verse_id, row) for verse_id, row in iter_corpus() if verse_id in changed_ids)
+
+        if removed:
+            print(f"🗑️  Deleting {len(removed)} verses no longer in the corpus...")
+            for batch in _chunked(_vector_ids(removed), client.get_max_batch_size()):
+                collection.delete(ids=batch)
+
+        publish_snapshot(build, collection, hashes)
+    except BaseException:
+        shutil.rmtree(build.path, ignore_errors=True)
+        raise
+
+    print(f"\n✅ Sync complete: {changed} upserted, {len(removed)} deleted, {len(hashes) - changed} unchanged.")
+
+
 if __name__ == "__main__":
-    build_vector_db()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or sync the Saarthi vector index.")
+    parser.add_argument("--full", action="store_true", help="Re-embed every verse into a fresh snapshot and publish it (the live index is not touched).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Encoder processes (default: INGEST_WORKERS, 0 = one per CPU core).")
+    args = parser.parse_args()
+
+    if args.full:
+        build_vector_db(workers=args.workers)
+    else:
+        sync_vector_db(workers=args.workers)
+
+    if settings.EMBEDDING_BACKEND == "onnx":
+        # Ready before the API starts, rather than exported on its first request
+        export_quantized_model()